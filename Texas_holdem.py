@@ -1,15 +1,40 @@
 # This game is for 3-10 people
-from random import shuffle
+from random import Random, shuffle
+
+from betting import Betting, blind_seats
+from chips import Chips
+from evaluator import HandState, hand_name
+from events import DEAL, NULL_SINK, SHOWDOWN, STREET, WIN, PrintSink
+from preflop import MAX_OPPONENTS, preflop_equity, preflop_place
 
 CARD_VALUES = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
 CARD_SUITS = ['\u2665', '\u2666', '\u2663', '\u2660']
 CARD_WEIGHT = [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14]
 
+# preflop: the best starting hands raise and reraise, the strong ones raise once,
+# the ones that win less than this part of a fair share fold
+PREMIUM_HANDS = 4
+STRONG_HANDS = 20
+FOLD_SHARE = 0.7
+DRAW_OUTS = 8  # a flush draw or an open-ended straight draw
+UNLIMITED = 1 << 62  # the chips of a seat in a Game without stacks, nobody is ever all-in
+
 
 class Card:
-    def __init__(self, number):
-        self.suit, self.value = divmod(number, 13)
-        self.weight = CARD_WEIGHT[self.value]
+    # There are only 52 cards, so every Card(number) is one of the interned CARDS and carries no __dict__
+    __slots__ = ('number', 'suit', 'value', 'weight')
+
+    def __new__(cls, number):
+        if len(CARDS) == 52:
+            return CARDS[number]
+        card = object.__new__(cls)
+        card.number = number
+        card.suit, card.value = divmod(number, 13)
+        card.weight = CARD_WEIGHT[card.value]
+        return card
+
+    def __reduce__(self):
+        return Card, (self.number,)
 
     def __str__(self):
         return CARD_VALUES[self.value] + CARD_SUITS[self.suit]
@@ -18,13 +43,79 @@ class Card:
         return str(self)
 
 
+CARDS = []
+CARDS.extend(Card(i) for i in range(52))
+
+# A card may also travel as its number 0-51 and a set of cards as a mask with bit 1 << number per card.
+# Card lists (a board, a hand) can hold Cards or numbers, and can be replaced by a mask altogether
+
+
+def to_card(card):
+    if card.__class__ is int:
+        return CARDS[card]
+    return card
+
+
+def to_number(card):
+    if card.__class__ is int:
+        return card
+    return card.number
+
+
+def card_mask(cards):
+    if cards.__class__ is int:
+        return cards
+    mask = 0
+    for card in cards:
+        if card.__class__ is int:
+            mask |= 1 << card
+        else:
+            mask |= 1 << card.number
+    return mask
+
+
+def mask_numbers(mask):
+    numbers = []
+    while mask:
+        low = mask & -mask
+        numbers.append(low.bit_length() - 1)
+        mask ^= low
+    return numbers
+
+
+def card_numbers(cards):
+    if cards.__class__ is int:
+        return mask_numbers(cards)
+    return [to_number(card) for card in cards]
+
+
 class Deck:
-    def __init__(self):
-        self.cards = [Card(i) for i in range(52)]
+    def __init__(self, compact=False, rng=None, order=None):
+        # a compact deck holds plain numbers instead of Cards.
+        # rng is a seed, a random.Random or a numpy Generator, without it the global random shuffles.
+        # order gives the cards (numbers) ready made, e.g. a row of shuffled_decks, and nothing is shuffled
+        if isinstance(rng, int):
+            rng = Random(rng)
+        self.rng = rng
+        if order is not None:
+            self.cards = [int(number) for number in order]
+            if not compact:
+                self.cards = [CARDS[number] for number in self.cards]
+            return
+        if compact:
+            self.cards = list(range(52))
+        else:
+            self.cards = CARDS.copy()
         self.shuffle()
 
     def shuffle(self):
-        shuffle(self.cards)
+        if self.rng is None:
+            shuffle(self.cards)
+        elif hasattr(self.rng, 'permuted'):  # a numpy Generator
+            order = self.rng.permutation(len(self.cards)).tolist()
+            self.cards[:] = [self.cards[idx] for idx in order]
+        else:
+            self.rng.shuffle(self.cards)
 
     def __str__(self):
         return f'Deck {len(self.cards)}'
@@ -39,22 +130,49 @@ class Deck:
         return self.cards.pop()
 
     def draw_cards(self, cards_count=0):
-        return [self.draw_card() for i in range(cards_count)]
+        # one slice instead of popping one by one, the cards come in the same order
+        if cards_count == 0:
+            return []
+        cards = self.cards[:-cards_count - 1:-1]
+        if len(cards) < cards_count:
+            raise IndexError('draw from an empty deck')
+        del self.cards[-cards_count:]
+        return cards
+
+    def draw_mask(self, cards_count=0):
+        return card_mask(self.draw_cards(cards_count))
+
+
+def shuffled_decks(count, rng=None):
+    # `count` shuffled decks in one go, every row is a deck as card numbers; rng is a seed or a numpy Generator
+    import numpy as np  # only the bulk mode needs NumPy
+    rng = np.random.default_rng(rng)
+    return rng.permuted(np.broadcast_to(np.arange(52, dtype=np.int8), (count, 52)), axis=1)
+
+
+class Strategy:
+    # How a player makes his stakes: preflop and street return his stake through the Game methods
+    # (make_raise, reraise, call, check, fold), which act on the Game's Betting. A fold works on every street:
+    # the player leaves the hand and what he has put in stays in the pot. This one plays the Game's own heuristics
+    def preflop(self, pl, game):
+        return game.evaluate_starting_hands(pl)
+
+    def street(self, pl, game, r, board):
+        return game.evaluate_combination(pl, r, board)
+
+
+DEFAULT_STRATEGY = Strategy()
 
 
 class Player:
-    def __init__(self, obj=Deck, number=1, stake=0):
+    def __init__(self, obj=Deck, number=1, stake=0, strategy=DEFAULT_STRATEGY):
         self.player_number = number
+        self.seat = number  # the same as player_number, a player who folds keeps both
         self.cards = obj.draw_cards(1)
         self.player_stake = stake
         self.poker_hand = None
-        self.kicker = None
-        # I needed the following attributes in order to determine the winner at the end
-        self.pair = 0
-        self.set = 0
-        self.full_house1 = 0
-        self.full_house2 = 0
-        self.two_pairs = 0
+        self.hand_rank = None  # the evaluator's number, the bigger one wins
+        self.strategy = strategy
 
     def __str__(self):
         return f'Player {self.player_number}: {self.cards}'
@@ -67,108 +185,138 @@ class Player:
 
 
 class Game():
-    def __init__(self):
+    def __init__(self, verbose=True, profiler=None, events=None, hand=0, stacks=None, blinds=None, eval_cache=None):
+        self.verbose = verbose
+        # an events sink gets every deal, blind, action, street and showdown of the hand number `hand`
+        if events is None:
+            events = PrintSink() if verbose else NULL_SINK
+        self.events = events
+        self.hand = hand
         self.dealer = None
         self.small_blind = None
         self.big_blind = None
         self.biggest_stake = None
-        self.stake_list = []
+        self.big_blind_stake = None
+        # (small blind, big blind); without them the small blind is 1 when player 1 posts it, 2 otherwise
+        self.blinds = blinds
+        self.betting = None  # the Betting of the hand, from the blinds on
+        self.seats = {}  # seat -> the Player dealt in there
+        self.stake_list = []  # the actions of the street
         self.flop = []
         self.turn = []
         self.river = []
         self.deleted_ones = []
         self.winner = None
         self.winners = []
+        self.pot = 0
+        self.actions = {}  # how many times every action was made, it is filled in by equalize
+        self.hand_states = {}  # player -> his HandState, it grows street by street
+        self.opponents = 1
+        self.deck_order = None
+        # with chip stacks (by seat, or the Chips of a session) the chips are really put in,
+        # and the pots are won at the showdown
+        self.chips = stacks if stacks is None or isinstance(stacks, Chips) else Chips(stacks)
+        self.payouts = None  # chips won by seat - 1
+        # an evalcache.EvalCache shared by the processes that play: the showdown hands are looked up in it
+        self.eval_cache = eval_cache
+        if profiler is not None:  # an instrumentation.Profiler times the phases of this game
+            profiler.attach(self)
 
     def define_dealer(self, lst_of_players):  # In order to determine the dealer, all players need to give a card. The dealer will be the one with the strongest card
         self.dealer = lst_of_players[0]
         for player in lst_of_players:
-            if player.cards[0].weight > self.dealer.cards[0].weight:
+            if to_card(player.cards[0]).weight > to_card(self.dealer.cards[0]).weight:
                 self.dealer = player
 
     def define_small_blind(self, nmb_of_players, lst_of_players):
-        self.small_blind = self.dealer.player_number + 1
-        if self.small_blind > nmb_of_players:
-            self.small_blind = lst_of_players[0].player_number
-        elif self.small_blind == nmb_of_players:
-            self.small_blind = lst_of_players[nmb_of_players - 1].player_number
+        # the seats go round from the dealer's, whoever has left the table is just not in the mask
+        self.seats = {player.seat: player for player in lst_of_players}
+        seated = sum(1 << player.seat - 1 for player in lst_of_players)
+        small_blind, big_blind = blind_seats(seated, self.dealer.seat)
+        self.small_blind = self.seats[small_blind]
+        if self.blinds is not None:
+            self.small_blind.player_stake = self.blinds[0]
+        elif self.small_blind.player_number == 1:
+            self.small_blind.player_stake = 1
         else:
-            self.small_blind = lst_of_players[self.small_blind - 1].player_number
-        self.small_blind = lst_of_players[self.small_blind - 1]
-        if self.small_blind.player_number == 1:
-            # print('Please make a stake')
-            # input
-            stake = 1
-            self.small_blind.player_stake = stake
-        else:
-            stake = 2
-            self.small_blind.player_stake = stake
+            self.small_blind.player_stake = 2
 
     def define_big_blind(self, nmb_of_players, lst_of_players):
-        self.big_blind = self.small_blind.player_number + 1
-        if self.big_blind > nmb_of_players:
-            self.big_blind = lst_of_players[0].player_number
-        elif self.big_blind == nmb_of_players:
-            self.big_blind = lst_of_players[nmb_of_players - 1].player_number
-        else:
-            self.big_blind = lst_of_players[self.big_blind - 1].player_number
-
-        self.big_blind = lst_of_players[self.big_blind - 1]
-        self.big_blind.player_stake = self.small_blind.player_stake * 2
-        self.biggest_stake = self.big_blind.player_stake
+        # the Betting posts both blinds
+        seated = sum(1 << seat - 1 for seat in self.seats)
+        small_blind, big_blind = blind_seats(seated, self.dealer.seat)
+        self.big_blind = self.seats[big_blind]
+        stake = self.small_blind.player_stake * 2 if self.blinds is None else self.blinds[1]
+        chips = self.chips
+        if chips is None:
+            chips = Chips([UNLIMITED] * max(self.seats))
+        self.betting = Betting(chips, self.dealer.seat, self.small_blind.player_stake, stake, seated, self.events,
+                               self.hand)
+        self.small_blind.player_stake = chips.street[small_blind - 1]
+        self.big_blind.player_stake = chips.street[big_blind - 1]
+        self.biggest_stake = self.betting.stake
+        self.big_blind_stake = stake
+
+    def act(self, pl, decide, *args):
+        # the player makes his stake through the action methods; a decision that makes none of them checks
+        actions = len(self.stake_list)
+        decide(pl, *args)
+        if len(self.stake_list) == actions:
+            self.check()
+        pl.player_stake = self.betting.chips.street[pl.seat - 1]
+
+    def announce(self, *args):
+        if self.verbose:
+            print(*args)
+
+    def bet(self, action):
+        # the action of the player to act goes to the Betting, which says what it was: a raise may turn
+        # into a call when no more raises are allowed or his chips do not cover it
+        if action in ('raise', 'reraise') and self.betting.raise_name() is None:
+            return self.call()
+        seat = self.betting.to_act
+        self.stake_list.append(self.betting.act(action))
+        self.biggest_stake = self.betting.stake
+        return self.betting.chips.street[seat - 1]
 
     def make_raise(self):
-        self.biggest_stake = self.biggest_stake * 2
-        self.stake_list.append('raise')
-        return self.biggest_stake
+        return self.bet('raise')
 
     def reraise(self):
-        self.biggest_stake = self.biggest_stake * 2
-        self.stake_list.append('reraise')
-        return self.biggest_stake
+        return self.bet('reraise')
 
     def call(self):
-        self.stake_list.append('call')
-        return self.biggest_stake
+        # matching the stake is a check when the player owes nothing
+        return self.bet('call' if self.betting.owes(self.betting.to_act) else 'check')
 
     def check(self):
-        pass
+        # a check facing a stake calls it
+        return self.call()
 
     def fold(self, pl):
-        self.stake_list.append('fold')
         self.deleted_ones.append(pl)
+        return self.bet('fold')
 
     def evaluate_starting_hands(self, pl):    # make a raise with the cards that most often win
-        card1 = pl.cards[0][0].weight         # exit the game with the cards that have a very small chance
-        card2 = pl.cards[0][1].weight         # of a good combination
-        suit1 = pl.cards[0][0].suit
-        suit2 = pl.cards[0][1].suit
-        if (card1 == 14 and card2 == 14) or (card1 == 13 and card2 == 13):
-            if self.stake_list.count('raise') == 0:
-                return self.make_raise()
-            else:
-                if self.stake_list.count('reraise') == 0:
-                    return self.reraise()
-                else:
-                    return self.call()
-        elif (card1 == 14 and card2 == 13) or (card1 == 13 and card2 == 14):
-            if self.stake_list.count('raise') == 0:
+        first, second = card_numbers(pl.cards[0])  # exit the game with the cards that have a very small chance
+        opponents = min(max(self.betting.live.bit_count() - 1, 1), MAX_OPPONENTS)
+        place = preflop_place(first, second, opponents)  # 0 is the best of the 169 starting hands
+        # 1 is a fair share of the pot against this many players
+        share = preflop_equity(first, second, opponents) * (opponents + 1)
+        if place < PREMIUM_HANDS:
+            if self.betting.raises == 0:
                 return self.make_raise()
             else:
-                if self.stake_list.count('reraise') == 0:
+                if self.betting.raises == 1:
                     return self.reraise()
                 else:
                     return self.call()
-        elif card1 >= 10 and card2 >= 10:
-            if self.stake_list.count('raise') == 0:
+        elif place < STRONG_HANDS:
+            if self.betting.raises == 0:
                 return self.make_raise()
             else:
                 return self.call()
-        if (card1 == 3 and card2 == 7) or (card1 == 7 and card2 == 3):
-            return self.fold(pl)
-        if (card1 == 3 and card2 == 11) or (card1 == 11 and card2 == 3):
-            return self.fold(pl)
-        if (card1 == 2 and card2 == 9) or (card1 == 9 and card2 == 2):
+        if share < FOLD_SHARE and self.betting.owes(pl.seat):
             return self.fold(pl)
         else:
             return self.call()
@@ -178,570 +326,245 @@ class Game():
         if pl.poker_hand == 'Royal Flush' or pl.poker_hand == 'Straight-flush':
             return self.make_raise()
         elif pl.poker_hand == 'Four of a kind':
-            if self.stake_list.count('raise') == 0 or self.stake_list.count('reraise') == 0:
+            if self.betting.raises < 2:
                 return self.make_raise()
             else:
                 return self.call()
         elif pl.poker_hand == 'Full House' or pl.poker_hand == 'Flush' or pl.poker_hand == 'Straight':
-            if self.stake_list.count('raise') == 0 or self.stake_list.count('reraise') == 0:
+            if self.betting.raises < 2:
                 return self.make_raise()
         elif pl.poker_hand == 'Three of a kind' or pl.poker_hand == 'Two Pairs' or pl.poker_hand == 'Pair':
             return self.call()
+        elif r == 'flop' and self.betting.owes(pl.seat) and self.flop_outs(pl, board) < DRAW_OUTS:
+            # nothing made and no good draw to pay for
+            return self.fold(pl)
         else:
             return self.call()
 
-    def first_round_bidding(self, nmb_of_players, lst_of_players):
-        next_stake = self.big_blind.player_number + 1
-        while next_stake != False:
-            if next_stake == nmb_of_players:
-                lst_of_players[nmb_of_players - 1].player_stake = self.evaluate_starting_hands(
-                    lst_of_players[nmb_of_players - 1])
-                print('Next is:', nmb_of_players, ', His stake:', lst_of_players[nmb_of_players - 1].player_stake)
-                next_stake = lst_of_players[0].player_number
-            elif next_stake > nmb_of_players:
-                lst_of_players[0].player_stake = self.evaluate_starting_hands(lst_of_players[0])
-                print('Next is:', lst_of_players[0].player_number, ', His stake:', lst_of_players[0].player_stake)
-                next_stake = lst_of_players[1].player_number
+    def bidding(self, lst_of_players, r, board):
+        # the betting round of a street, yielding (player, street, board) before every action: a decide function
+        # sent back makes the player's stake, None leaves it to his strategy
+        betting = self.betting
+        while not betting.street_over() and not betting.hand_over():
+            player = self.seats[betting.to_act]
+            decide = yield player, r, board
+            if decide is not None:
+                self.act(player, decide)
+            elif r == 'preflop':
+                self.act(player, player.strategy.preflop, self)
             else:
-                lst_of_players[next_stake - 1].player_stake = self.evaluate_starting_hands(
-                    lst_of_players[next_stake - 1])
-                print('Next is:', next_stake, ', His stake:', lst_of_players[next_stake - 1].player_stake)
-                next_stake = next_stake + 1
-            if next_stake == self.big_blind.player_number:
-                lst_of_players[next_stake - 1].player_stake = self.evaluate_starting_hands(
-                    lst_of_players[next_stake - 1])
-                print('Next is:', next_stake, ', His stake:', lst_of_players[next_stake - 1].player_stake)
-                next_stake = False
+                self.act(player, player.strategy.street, self, r, board)
+
+    def first_round_bidding(self, nmb_of_players, lst_of_players):
+        self.opponents = nmb_of_players - 1
+        for _ in self.bidding(lst_of_players, 'preflop', []):
+            pass
+
+    def flop_numbers(self, board):
+        # the three flop cards of a board; a mask does not know which of its cards came first, the flop does
+        if board.__class__ is not int:
+            return card_numbers(board[:3])
+        if board.bit_count() > 3:
+            return self.flop_numbers(self.flop)
+        return mask_numbers(board)
+
+    def flop_info(self, board):
+        # texture and draws of the flop, from the flop index
+        from flops import flop_index  # a hand that never asks does not import the index
+        return flop_index().flop(self.flop_numbers(board))
+
+    def flop_outs(self, pl, board):
+        # how many turn cards lift the category of the player's hand on the flop, from the flop index
+        from flops import flop_index
+        first, second = card_numbers(pl.cards[0])
+        return flop_index().outs_of(self.flop_numbers(board), first, second)
 
     def next_round_bidding(self, nmb_of_players, lst_of_players, r, board):
-        if len(self.deleted_ones) != 0:
-            making_stake = 0
-            if self.dealer.player_number > nmb_of_players:
-                making_stake = lst_of_players[ 0 ].player_number
-            else:
-                for player in lst_of_players:
-                    if player.player_number == self.dealer.player_number:
-                        making_stake = player.player_number
-                        break
-            if making_stake == 1:
-                stop = nmb_of_players
-            else:
-                stop = making_stake - 1
-            while making_stake != stop:
-                lst_of_players[making_stake - 1].player_stake = self.evaluate_combination(
-                    lst_of_players[making_stake - 1], r, board)
-                print('Next is:', lst_of_players[making_stake - 1].player_number, ', His stake:',
-                      lst_of_players[making_stake - 1].player_stake)
-                making_stake = making_stake + 1
-                if making_stake > nmb_of_players:
-                    making_stake = 1
+        for _ in self.bidding(lst_of_players, r, board):
+            pass
+
+    def equalize(self, lst_of_players):
+        # the street is over: its stakes go to the pot and the next street starts with nobody's stake
+        for action in self.stake_list:
+            self.actions[action] = self.actions.get(action, 0) + 1
+        self.stake_list.clear()
+        self.pot = self.betting.chips.amount()
+        if self.betting.street < 3:
+            self.betting.next_street()
         else:
-            making_stake = self.dealer.player_number + 1
-            while making_stake != self.dealer.player_number:
-                if making_stake == nmb_of_players:
-                    lst_of_players[nmb_of_players - 1].player_stake = self.evaluate_combination(
-                        lst_of_players[nmb_of_players - 1], r, board)
-                    print('Next is:', lst_of_players[nmb_of_players - 1].player_number, ', His stake:',
-                          lst_of_players[nmb_of_players - 1].player_stake)
-                    making_stake = lst_of_players[0].player_number
-                elif making_stake > nmb_of_players:
-                    lst_of_players[0].player_stake = self.evaluate_combination(lst_of_players[0], r, board)
-                    print('Next is:', lst_of_players[0].player_number, ', His stake:',
-                          lst_of_players[0].player_stake)
-                    making_stake = lst_of_players[1].player_number
-                else:
-                    lst_of_players[making_stake - 1].player_stake = self.evaluate_combination(
-                        lst_of_players[making_stake - 1], r, board)
-                    print('Next is:', lst_of_players[making_stake - 1].player_number, ', His stake:',
-                          lst_of_players[making_stake - 1].player_stake)
-                    making_stake = making_stake + 1
-                if making_stake == self.dealer.player_number:
-                    lst_of_players[making_stake - 1].player_stake = self.evaluate_combination(
-                        lst_of_players[making_stake - 1], r, board)
-                    print('Next is:', lst_of_players[making_stake - 1].player_number, ', His stake:',
-                          lst_of_players[making_stake - 1].player_stake)
-
-    def equalize(self, lst_of_players):    #this feature equalizes all bets to start the next round
-        stake = lst_of_players[0].player_stake
-        count = 0
-        for player in lst_of_players:
-            if player.player_stake == stake:
-                count = count + 1
-        if count != number_of_players:
-            for player in players:
-                player.player_stake = game.call()
-        game.stake_list.clear()
+            self.betting.chips.end_street()
+        self.biggest_stake = self.betting.stake
 
     def check_del(self, nmb_of_players, lst_of_players):
-        if len(game.deleted_ones) != 0:
-            for player in game.deleted_ones:
-                lst_of_players.remove(player)
-            for idx, player in enumerate(lst_of_players):
-                if idx == 0:
-                    player.player_number = 1
-                else:
-                    player.player_number = players[idx - 1].player_number + 1
-            nmb_of_players = nmb_of_players - len(game.deleted_ones)
+        # the players who folded leave the list, everybody keeps his seat and his number
+        live = self.betting.live
+        lst_of_players[:] = [player for player in lst_of_players if live >> player.seat - 1 & 1]
+        return len(lst_of_players)
 
     def make_combination(self, playerr, lst_of_cards):
-        lst_of_cards.append(playerr.cards[0][0])
-        lst_of_cards.append(playerr.cards[0][1])
-        lst_of_suits = []
-        lst_of_weights = []
-        for card in lst_of_cards:
-            lst_of_suits.append(card.suit)
-        for idx, suit in enumerate(lst_of_suits):
-            if lst_of_suits.count(suit) == 5:
-                for card in lst_of_cards:
-                    if card.suit == suit:
-                        lst_of_weights.append(card.weight)
-                lst_of_weights = list(set(lst_of_weights))
-                if len(lst_of_weights) == 5:
-                    if lst_of_weights[0] == 10:
-                        playerr.poker_hand = 'Royal Flush'
-                    elif lst_of_weights[len(lst_of_weights) - 1] - lst_of_weights[0] == 4:
-                        playerr.poker_hand = 'Straight-flush'
-                else:
-                    playerr.poker_hand = 'Flush'
-                break
-            if idx + 1 == 4:  # there is no point in checking further if the first 3 cards did not find the required number of matches
-                break
-        if playerr.poker_hand != 'Royal Flush' or playerr.poker_hand != 'Straight-flush':
-            lst_of_ranks = []
-            result_lst = []
-            for card in lst_of_cards:
-                lst_of_ranks.append(card.weight)
-            for rank in lst_of_ranks:
-                quantity = lst_of_ranks.count(rank)
-                if quantity == 2 or quantity == 3:
-                    if result_lst.count(str(rank)) == 0:
-                        result_lst.append(str(rank))
-                        result_lst.append(quantity)
-                if quantity == 4:
-                    if playerr.cards[0][0] == rank or playerr.cards[0][1] == rank:
-                        playerr.poker_hand = 'Four of a kind'
-            if result_lst.count(3) == 1 and result_lst.count(2) == 1:
-                if playerr.poker_hand != 'Four of a kind':
-                    playerr.poker_hand = 'Full House'
-            elif result_lst.count(3) == 1:
-                playerr.poker_hand = 'Three of a kind'
-            elif result_lst.count(2) == 2:
-                playerr.poker_hand = 'Two Pairs'
-            elif result_lst.count(2) == 1:
-                playerr.poker_hand = 'Pair'
-        if playerr.poker_hand == None:
-            if playerr.cards[0][0].weight > playerr.cards[0][1].weight:
-                playerr.poker_hand = playerr.cards[0][0]
+        state = self.update_hand_state(playerr, lst_of_cards)
+        if self.eval_cache is not None and state.count == 7:
+            playerr.hand_rank = self.eval_cache.evaluate(state.mask)
+        else:
+            playerr.hand_rank = state.value()
+        playerr.poker_hand = hand_name(playerr.hand_rank)
+        if playerr.poker_hand == 'High card':
+            first, second = card_numbers(playerr.cards[0])
+            if CARDS[first].weight > CARDS[second].weight:
+                playerr.poker_hand = CARDS[first]
             else:
-                playerr.poker_hand = playerr.cards[0][1]
-        lst_of_cards.pop()
-        lst_of_cards.pop()
+                playerr.poker_hand = CARDS[second]
+
+    def update_hand_state(self, playerr, lst_of_cards):
+        # the board only grows from the flop to the river, so just the cards of the new street are added
+        state = self.hand_states.get(playerr)
+        if lst_of_cards.__class__ is int:
+            hole = card_mask(playerr.cards[0])
+            if state is None or state.mask & ~(lst_of_cards | hole):
+                state = self.hand_states[playerr] = HandState(mask_numbers(hole))
+            state.add_mask(lst_of_cards)
+            return state
+        # a board that is not the one the state was built on, or other hole cards, start over
+        if state is None or state.count - 2 > len(lst_of_cards) or \
+                state.mask != card_mask(playerr.cards[0]) | card_mask(lst_of_cards[:state.count - 2]):
+            state = self.hand_states[playerr] = HandState(card_numbers(playerr.cards[0]))
+        for card in lst_of_cards[state.count - 2:]:
+            state.add(to_number(card))
+        return state
 
     def i_forgot_about_the_street_but_its_too_late(self, lst_of_players, lst_of_cards):
+        # the evaluator sees straights of any ranks, so the whole street is just evaluated again
         for player in lst_of_players:
-            if player.poker_hand != 'Royal Flush' and player.poker_hand != 'Straight-flush' and player.poker_hand != 'Four of a kind' and player.poker_hand != 'Full House' and player.poker_hand != 'Flush':
-                lst_of_cards.append(player.cards[ 0 ][ 0 ])
-                lst_of_cards.append(player.cards[ 0 ][ 1 ])
-                lst_of_ranks = [ ]
-                for card in lst_of_cards:
-                    lst_of_ranks.append(card.weight)
-                first_straight = [ ]
-                second_straight = [ ]
-                third_straight = [ ]
-                for rank in lst_of_ranks:
-                    if 2 < rank <= 6:
-                        if first_straight.count(rank) == 0:
-                            first_straight.append(rank)
-                    if 5 < rank <= 9:
-                        if second_straight.count(rank) == 0:
-                            second_straight.append(rank)
-                    if 9 < rank <= 13:
-                        if third_straight.count(rank) == 0:
-                            third_straight.append(rank)
-                    if len(first_straight) == 5 or len(second_straight) == 5 or len(third_straight) == 5:
-                        player.poker_hand = 'Straight'
+            self.make_combination(player, lst_of_cards)
+
+    def street_equity(self, lst_of_players, board):
+        # exact chances of every player to win from the current street (flop, turn or river) on
+        from equity import exact_equity  # equity needs NumPy and imports this module itself
+        return exact_equity([player.cards[0] for player in lst_of_players], board)
 
     def define_winner(self, lst_of_players):
+        # one number per player decides everything, equal numbers are an exact tie
         for player in lst_of_players:
-            if player.cards[0][0].weight > player.cards[0][1].weight:
-                player.kicker = player.cards[0][0].weight
-            else:
-                player.kicker = player.cards[0][1].weight
-        ph_lst = []
-        for player in lst_of_players:
-            ph_lst.append(player.poker_hand)
-        # ---------------------------------
-        for player in lst_of_players:
-            if player.poker_hand == 'Royal Flush' or player.poker_hand == 'Straight-flush':
-                self.winner = player
-                break
-            elif player.poker_hand == 'Four of a kind' and (
-                    ph_lst.count('Royal Flush') == 0 and ph_lst.count('Straight-flush') == 0):
-                if ph_lst.count('Four of a kind') == 0:
-                    self.winner = player
-                    break
-                else:  # otherwise, Four of a kind is collected on the Board
-                    kickers_lst = []
-                    for player in lst_of_players:
-                        kickers_lst.append(player.kicker)
-                    the_biggest = max(kickers_lst)
-                    if kickers_lst.count(the_biggest) != 1:
-                        for player in lst_of_players:
-                            if player.kicker == the_biggest:
-                                self.winners.append(player)
-                    else:
-                        for player in lst_of_players:
-                            if player.kicker == the_biggest:
-                                self.winner = player
-                                break
-            elif player.poker_hand == 'Full House' and (
-                    ph_lst.count('Four of a kind') == 0 and ph_lst.count('Royal Flush') == 0 and ph_lst.count(
-                    'Straight-flush') == 0):
-                if ph_lst.count('Full House') == 0:
-                    self.winner = player
-                    break
-                else:
-                    # we need to find all the players who have a full house
-                    for player in players:
-                        if player.poker_hand == 'Full House':
-                            self.river.append(player.cards[0][0])
-                            self.river.append(player.cards[0][1])
-                            lst_of_ranks = [ ]
-                            for card in self.river:
-                                lst_of_ranks.append(card.weight)
-                            # looking for "тройки"
-                            for card in lst_of_ranks:
-                                if lst_of_ranks.count(card) == 3:
-                                    player.full_house1 = card  # add kind of "тройки"
-                                    break  # we stop if we find it
-                            # same with the deuce
-                            for card in lst_of_ranks:
-                                if lst_of_ranks.count(card) == 2:
-                                    player.full_house2 = card
-                                    break
-                            self.river.pop()
-                            self.river.pop()
-                            lst_of_ranks.clear()
-                    # now players with this combination have their highest triples and deuces recorded
-                    # now we are trying to calculate the highest three, to do this, we will combine them all in one sheet
-                    lst_of_max = [ ]
-                    for player in players:
-                        if player.poker_hand == 'Full House':
-                            lst_of_max.append(player.full_house1)
-                    max_rank = max(lst_of_max)
-                    if lst_of_max.count(max_rank) == 1:  # if the triples of different players do not match
-                        for player in players:
-                            if player.poker_hand == 'Full House':
-                                if player.full_house1 == max_rank:
-                                    self.winner = player
-                    else:
-                        # if the ranks of triples are the same for all
-                        lst_of_max.clear()
-                        for player in players:
-                            if player.poker_hand == 'Full House':
-                                lst_of_max.append(player.full_house2)
-                        max_rank = max(lst_of_max)
-                        if lst_of_max.count(max_rank) == 1:
-                            for player in players:
-                                if player.poker_hand == 'Full House':
-                                    if player.full_house2 == max_rank:
-                                        self.winner = player
-                                        break
-                        else:
-                            for player in players:
-                                if player.poker_hand == 'Full House':
-                                    if player.full_house2 == max_rank:
-                                        self.winners.append(player)
-            elif player.poker_hand == 'Flush' and (
-                    ph_lst.count('Full House') == 0 and ph_lst.count('Four of a kind') == 0 and ph_lst.count(
-                    'Royal Flush') == 0 and ph_lst.count('Straight-flush') == 0):
-                if ph_lst.count('Flush') == 0:
-                    self.winner = player
-                    break
-                else:
-                    lst_of_suits = [ ]
-                    for card in self.river:
-                        lst_of_suits.append(card.suit)
-                    for card in lst_of_suits:
-                        if lst_of_suits.count(card) == 5:  # flush on the board
-                            for player in lst_of_players:
-                                self.winners.append(player)
-                            break
-                        elif lst_of_suits.count(card) == 3 or lst_of_suits.count(card) == 4:
-                            # so you need to check the kickers
-                            kickers_lst = []
-                            for player in lst_of_players:
-                                if player.poker_hand == 'Flush':
-                                    kickers_lst.append(player.kicker)
-                            max_kicker = max(kickers_lst)
-                            if kickers_lst.count(max_kicker) == 1:
-                                for player in lst_of_players:
-                                    if player.poker_hand == 'Flush':
-                                        if player.kicker == max_kicker:
-                                            self.winner = player
-                            else:
-                                for player in lst_of_players:
-                                    if player.poker_hand == 'Flush':
-                                        if player.kicker == max_kicker:
-                                            self.winners.append(player)
-            elif player.poker_hand == 'Straight' and (
-                    ph_lst.count('Flush') == 0 and ph_lst.count('Full House') == 0 and ph_lst.count(
-                    'Four of a kind') == 0 and ph_lst.count('Royal Flush') == 0 and ph_lst.count(
-                    'Straight-flush') == 0):
-                if ph_lst.count('Straight') == 0:
-                    self.winner = player
-                    break
-            elif player.poker_hand == 'Three of a kind' and (
-                    ph_lst.count('Straight') == 0 and ph_lst.count('Flush') == 0 and ph_lst.count(
-                    'Full House') == 0 and ph_lst.count('Four of a kind') == 0 and ph_lst.count(
-                    'Royal Flush') == 0 and ph_lst.count('Straight-flush') == 0):
-                if ph_lst.count('Three of a kind') == 0:
-                    self.winner = player
-                    break
-                else:
-                    lst_of_ranks = [ ]
-                    for card in self.river:
-                        lst_of_ranks.append(card.weight)
-                    for card in lst_of_ranks:
-                        if lst_of_ranks.count(card) == 3:
-                            for player in lst_of_players:
-                                self.winners.append(player)
-                    if len(self.winners) == 0:
-                        for player in lst_of_players:
-                            if player.poker_hand == 'Three of a kind':
-                                # kimd of set
-                                self.river.append(player.cards[0][0])
-                                self.river.append(player.cards[0][1])
-                                lst_of_ranks = [ ]
-                                for card in self.river:
-                                    lst_of_ranks.append(card.weight)
-                                for card in lst_of_ranks:
-                                    if lst_of_ranks.count(card) == 3:
-                                        player.set = card  # adding a card from the set to the player for later comparison
-                                self.river.pop()
-                                self.river.pop()
-                                lst_of_ranks.clear()
-                        lst_of_max = []
-                        for player in lst_of_players:
-                            if player.poker_hand == 'Three of a kind':
-                                lst_of_max.append(player.set)
-                        max_card = max(lst_of_max)
-                        if lst_of_max.count(max_card) == 1:
-                            for player in lst_of_players:
-                                if player.poker_hand == 'Three of a kind':
-                                    if player.set == max_card:
-                                        self.winner = player
-                                        break
-                                else:
-                                    for player in lst_of_players:
-                                        if player.poker_hand == 'Three of a kind':
-                                            if player.set == max_card:
-                                                self.winners.append(player)
-
-            elif player.poker_hand == 'Two Pairs' and (
-                    ph_lst.count('Three of a kind') == 0 and ph_lst.count('Straight') == 0 and ph_lst.count(
-                    'Flush') == 0 and ph_lst.count('Full House') == 0 and ph_lst.count(
-                    'Four of a kind') == 0 and ph_lst.count('Royal Flush') == 0 and ph_lst.count(
-                    'Straight-flush') == 0):
-                if ph_lst.count('Two Pairs') == 0:
-                    self.winner = player
-                    break
-                else:
-                    for player in lst_of_players:
-                        if player.poker_hand == 'Two Pairs':
-                            self.river.append(player.cards[0][0])
-                            self.river.append(player.cards[0][1])
-                            lst_of_ranks = [ ]
-                            result_lst = [ ]
-                            for card in self.river:
-                                lst_of_ranks.append(card.weight)
-                            for card in lst_of_ranks:
-                                if lst_of_ranks.count(card) == 2:
-                                    if result_lst.count(card) == 0:
-                                        result_lst.append(card)
-                            max_card = max(result_lst)
-                            player.two_pairs = max_card
-                            self.river.pop()
-                            self.river.pop()
-                            lst_of_ranks.clear()
-                            result_lst.clear()
-                    lst_of_max = [ ]
-                    for player in lst_of_players:
-                        if player.poker_hand == 'Two Pairs':
-                            lst_of_max.append(player.two_pairs)
-                    max_card = max(lst_of_max)
-                    if lst_of_max.count(max_card) == 1:
-                        for player in lst_of_players:
-                            if player.poker_hand == 'Two Pairs':
-                                if player.two_pairs == max_card:
-                                    self.winner = player
-                                    break
-                    else:
-                        for player in lst_of_players:
-                            if player.poker_hand == 'Two Pairs':
-                                if player.two_pairs == max_card:
-                                    self.winners.append(player)
-            elif player.poker_hand == 'Pair' and (
-                    ph_lst.count('Two Pairs') == 0 and ph_lst.count('Three of a kind') == 0 and ph_lst.count(
-                    'Straight') == 0 and ph_lst.count('Flush') == 0 and ph_lst.count(
-                    'Full House') == 0 and ph_lst.count('Four of a kind') == 0 and ph_lst.count(
-                    'Royal Flush') == 0 and ph_lst.count('Straight-flush') == 0):
-                if ph_lst.count('Pair') == 0:
-                    self.winner = player
-                    break
-                else:
-                    # you need to collect all the pairs (often it is collected on the Board)
-                    lst_of_ranks = [ ]
-                    for card in self.river:
-                        lst_of_ranks.append(card.weight)
-                    for card in lst_of_ranks:
-                        if lst_of_ranks.count(card) == 2:
-                            for player in lst_of_players:
-                                self.winners.append(player)
-                    lst_of_ranks.clear()
-                    if len(self.winners) == 0:
-                        for player in lst_of_players:
-                            if player.poker_hand == 'Pair':
-                                self.river.append(player.cards[0][0])
-                                self.river.append(player.cards[0][1])
-                                lst_of_ranks = [ ]
-                                for card in self.river:
-                                    lst_of_ranks.append(card.weight)
-                                for card in lst_of_ranks:
-                                    if lst_of_ranks.count(card) == 2:
-                                        player.pair = card
-                                self.river.pop()
-                                self.river.pop()
-                                lst_of_ranks.clear()
-                        # after all the high cards are saved we will add them to the General list and calculate the highest one
-                        lst_of_max = []
-                        for player in lst_of_players:
-                            if player.poker_hand == 'Pair':
-                                lst_of_max.append(player.pair)
-                        max_card = max(lst_of_max)
-                        if lst_of_max.count(max_card) == 1:
-                            for player in lst_of_players:
-                                if player.poker_hand == 'Pair':
-                                    if player.pair == max_card:
-                                        self.winner = player
-                                        break
-                                else:
-                                    for player in lst_of_players:
-                                        if player.poker_hand == 'Pair':
-                                            if player.pair == max_card:
-                                                self.winners.append(player)
-            else:
-                if ph_lst.count('Pair') == 0 and ph_lst.count('Two Pairs') == 0 and ph_lst.count(
-                        'Three of a kind') == 0 and ph_lst.count('Straight') == 0 and ph_lst.count(
-                        'Flush') == 0 and ph_lst.count('Full House') == 0 and ph_lst.count(
-                        'Four of a kind') == 0 and ph_lst.count('Royal Flush') == 0 and ph_lst.count(
-                        'Straight-flush') == 0:
-                    kickers_lst = [ ]
-                    for player in lst_of_players:
-                        kickers_lst.append(player.kicker)
-                    max_kicker = max(kickers_lst)
-                    if kickers_lst.count(max_kicker) == 1:
-                        for player in players:
-                            if player.kicker == max_kicker:
-                                self.winner = player
-                                break
-                    else:
-                        for player in players:
-                            if player.kicker == max_kicker:
-                                self.winners.append(player)
-
+            self.make_combination(player, self.river)
+            self.events.emit(self.hand, SHOWDOWN, player.seat, player.hand_rank, card_mask(player.cards[0]))
+        best = max(player.hand_rank for player in lst_of_players)
+        self.winners = [player for player in lst_of_players if player.hand_rank == best]
+        for player in self.winners:
+            self.events.emit(self.hand, WIN, player.seat, best, 0)
+        if len(self.winners) == 1:
+            self.winner = self.winners[0]
+            self.winners = []
+        self.settle(lst_of_players)
+
+    def settle(self, lst_of_players):
+        # the side pots go to the best hands among the players who can win them, ties split them
+        if self.chips is not None:
+            values = {player.seat: player.hand_rank or 0 for player in lst_of_players}
+            self.payouts = self.chips.settle(values, self.dealer.seat)
+
+
+def play_hand(number_of_players=4, verbose=False, rng=None, profiler=None, events=None, hand=0, stacks=None,
+              strategies=None):
+    # one whole hand from drawing the dealer to the showdown, returns the game and the players left in it.
+    # strategies: a Strategy for every seat, the Game's own by default
+    game, players, deck = start_hand(number_of_players, verbose, rng, profiler, events, hand, stacks, strategies)
+    for _ in hand_steps(game, players, deck):
+        pass
+    return game, players
 
-if __name__ == '__main__':
 
-    deck = Deck()
-    '''
-    number_of_players = int(input('Enter the number of participants'))
-    if number_of_players < 3 or number_of_players > 10:
-        raise Exception("This game is for 3-10 people!")
-    '''
-    number_of_players = 4
-    player_count = 0
+def start_hand(number_of_players=4, verbose=False, rng=None, profiler=None, events=None, hand=0, stacks=None,
+               strategies=None):
+    # the game, the players and the shuffled deck of a new hand once the dealer is drawn, ready for hand_steps
+    deck = Deck(rng=rng)
     players = []
+    for number in range(1, number_of_players + 1):
+        if strategies is None:
+            players.append(Player(deck, number))
+        else:
+            players.append(Player(deck, number, strategy=strategies[number - 1]))
+    game = Game(verbose, profiler, events, hand, stacks)
+    game.announce(players)
 
-    while player_count != number_of_players:
-        players.append(Player(deck, player_count + 1))
-        player_count += 1
-
-    print(players)
-
-    game = Game()
     game.define_dealer(players)
-    print('The dealer is the player number', game.dealer.player_number)
+    game.announce('The dealer is the player number', game.dealer.player_number)
 
     # return the card to the deck
     for player in players:
         deck.cards.append(player.cards[0])
     deck.shuffle()
+    return game, players, deck
 
-    game.define_small_blind(number_of_players, players)
-    print('The small blind is player number', game.small_blind.player_number)
-    print('Small blind stake is:', game.small_blind.player_stake)
 
+def hand_steps(game, players, deck, bid=None):
+    # the hand after the dealer is known, from the blinds to the showdown, dealt from the end of the deck;
+    # players ends up holding the players left in the hand.
+    # bid(street, board) plays the betting round of a street and returns what the players to act are yielded
+    # from (Game.bidding, so the decisions can come from outside); by default the strategies bid through
+    # first_round_bidding and next_round_bidding and nothing is yielded
+    hand = game.hand
+    game.deck_order = deck.cards.copy()  # the hole cards and the board are drawn from the end of it
+    number_of_players = len(players)
+
+    game.define_small_blind(number_of_players, players)
     game.define_big_blind(number_of_players, players)
-    print('The big blind is player number', game.big_blind.player_number)
-    print('Big blind stake is:', game.big_blind.player_stake)
+    game.announce('The small blind is player number', game.small_blind.player_number)
+    game.announce('Small blind stake is:', game.small_blind.player_stake)
+    game.announce('The big blind is player number', game.big_blind.player_number)
+    game.announce('Big blind stake is:', game.big_blind.player_stake)
 
-    print('-----------------')
+    game.announce('-----------------')
 
     for player in players:
-        player.cards.clear()
-        player.cards.append(deck.draw_cards(2))
-
-    print(players)
-
-    game.first_round_bidding(number_of_players, players)
-    # if someone decided to leave the game with bad cards
-    if len(game.deleted_ones) != 0:
-        for player in game.deleted_ones:
-            players.remove(player)
-        for idx, player in enumerate(players):
-            if idx == 0:
-                player.player_number = 1
-            else:
-                player.player_number = players[ idx - 1 ].player_number + 1
-        number_of_players = number_of_players - len(game.deleted_ones)
-
-    print(players)
-
-    game.equalize(players)
+        if player.cards:
+            player.cards[0] = deck.draw_cards(2)
+            del player.cards[1:]
+        else:
+            player.cards.append(deck.draw_cards(2))
+        game.events.emit(hand, DEAL, player.seat, 0, card_mask(player.cards[0]))
+
+    game.announce(players)
+
+    if bid is None:
+        game.opponents = number_of_players - 1
+    board = []
+    for street, count in (('preflop', 0), ('flop', 3), ('turn', 1), ('river', 1)):
+        if count:
+            board = board + deck.draw_cards(count)
+            setattr(game, street, board)
+            game.announce(street.capitalize() + ':', board)
+            game.events.emit(hand, STREET, 0, 0, card_mask(board))
+        if bid is not None:
+            yield from bid(street, board)
+        elif street == 'preflop':
+            game.first_round_bidding(number_of_players, players)
+        else:
+            game.next_round_bidding(number_of_players, players, street, board)
+        # the players who folded leave the hand
+        number_of_players = game.check_del(number_of_players, players)
+        game.equalize(players)
+        for player in players:
+            game.announce(player.player_stake)
+        if number_of_players < 2:
+            # everybody else has folded, the hand is over
+            game.winner = players[0]
+            game.settle(players)
+            return
 
     for player in players:
-        print(player.player_stake)
-
-    game.flop = deck.draw_cards(3)
-    print('Flop:', game.flop)
-
-    round1 = 'flop'
-    game.next_round_bidding(number_of_players, players, round1, game.flop)
-
-    game.equalize(players)
-
-    round2 = 'turn'
-    game.turn = game.flop.copy()
-    game.turn.append(deck.draw_cards(1)[ 0 ])
-    print('Turn:', game.turn)
-
-    game.next_round_bidding(number_of_players, players, round2, game.turn)
-    game.equalize(players)
+        game.announce(player.player_number, player.poker_hand)
 
-    round3 = 'river'
-    game.river = game.turn.copy()
-    game.river.append(deck.draw_cards(1)[ 0 ])
-    print('River:', game.river)
-
-    game.equalize(players)
-
-    game.next_round_bidding(number_of_players, players, round3, game.river)
+    game.define_winner(players)
 
-    for player in players:
-        print(player.player_number, player.poker_hand)
 
-    game.define_winner(players)
+if __name__ == '__main__':
+    '''
+    number_of_players = int(input('Enter the number of participants'))
+    if number_of_players < 3 or number_of_players > 10:
+        raise Exception("This game is for 3-10 people!")
+    '''
+    number_of_players = 4
+    game, players = play_hand(number_of_players, verbose=True)
 
     if len(game.winners) != 0:
         print(list(set(game.winners)))
@@ -0,0 +1,55 @@
+# The evaluator's tables as NumPy arrays, so whole batches of hands are ranked in one call
+import numpy as np
+
+from evaluator import BIT_COUNT, FLUSH_SUIT, FLUSH_TABLE, RANK_KEYS, RANK_TABLE, SUIT_KEYS
+
+CARD_RANK_KEYS = np.array(RANK_KEYS, dtype=np.int64)
+CARD_SUIT_KEYS = np.array(SUIT_KEYS, dtype=np.int32)
+CARD_SUITS = np.arange(52, dtype=np.int32) // 13
+CARD_RANK_BITS = np.int32(1) << (np.arange(52, dtype=np.int32) % 13)
+
+# the rank keys are sparse, so the rank table becomes a sorted key column and a value column
+SORTED_RANK_KEYS = np.array(sorted(RANK_TABLE), dtype=np.int64)
+RANK_VALUES = np.array([RANK_TABLE[key] for key in SORTED_RANK_KEYS.tolist()], dtype=np.int32)
+FLUSH_SUITS = np.array(FLUSH_SUIT, dtype=np.int8)
+FLUSH_VALUES = np.array(FLUSH_TABLE, dtype=np.int32)
+BIT_COUNTS = np.array(BIT_COUNT, dtype=np.int8)
+
+
+def evaluate_keys(rank_keys, suit_keys, cards):
+    # rank_keys and suit_keys are the sums over the last axis of cards
+    values = RANK_VALUES[np.searchsorted(SORTED_RANK_KEYS, rank_keys)]
+    flush_suits = FLUSH_SUITS[suit_keys]
+    rows = np.nonzero(flush_suits >= 0)
+    if rows[0].size:
+        flush_cards = cards[rows]
+        in_suit = CARD_SUITS[flush_cards] == flush_suits[rows][..., None].astype(np.int32)
+        # the cards of one suit have different ranks, so the sum of their bits is their union
+        bits = np.where(in_suit, CARD_RANK_BITS[flush_cards], 0).sum(axis=-1)
+        values[rows] = FLUSH_VALUES[bits]
+    return values
+
+
+def evaluate_batch(cards):
+    # cards: an integer array of shape (..., 5 to 7) with card numbers, returns an int32 array of shape (...)
+    cards = np.asarray(cards, dtype=np.intp)
+    return evaluate_keys(CARD_RANK_KEYS[cards].sum(axis=-1), CARD_SUIT_KEYS[cards].sum(axis=-1), cards)
+
+
+def showdown_ranking(board, holes):
+    # board: 3-5 card numbers, holes: (players, 2) card numbers. Returns the players best first as groups
+    # of tied indexes into holes, and the hand value of every group. One batch evaluation, nothing is modified
+    board = np.asarray(board, dtype=np.intp)
+    holes = np.asarray(holes, dtype=np.intp).reshape(-1, 2)
+    if not len(holes):
+        return [], []
+    cards = np.empty((len(holes), board.size + 2), dtype=np.intp)
+    cards[:, :board.size] = board
+    cards[:, board.size:] = holes
+    if np.unique(cards[:, board.size:]).size != holes.size or np.isin(board, holes).any():
+        raise ValueError('A card is dealt twice')
+    values = evaluate_batch(cards)
+    order = np.argsort(-values, kind='stable')
+    ranked = values[order]
+    starts = np.flatnonzero(np.concatenate(([True], ranked[1:] != ranked[:-1])))
+    return [group.tolist() for group in np.split(order, starts[1:])], ranked[starts].tolist()
@@ -0,0 +1,300 @@
+# Benchmarks of dealing, evaluation, showdown and whole hands on fixed seeds and fixed hand corpora.
+#   python benchmarks.py              run them and compare with the saved baseline
+#   python benchmarks.py --save       run them and save the results as the new baseline
+#   python benchmarks.py --all-hands  also evaluate every 7-card hand and check the counts of the hand types
+#   python benchmarks.py --startup    also time a new process dealing and playing one hand, against the budget
+# Every benchmark is timed along with a plain Python loop, and its speed is compared with the baseline relative
+# to the speed of that loop then and when the baseline was saved: another machine, or the same one busier,
+# is not taken for a change of the code. A baseline speed saved without the loop is only reported.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from random import Random
+
+from chips import Chips
+from Texas_holdem import Deck, Game, Player, card_numbers, play_hand
+from evaluator import HAND_NAMES, category, evaluate
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(DIRECTORY, 'benchmark_baseline.json')
+SEED = 2024
+TOLERANCE = 0.25  # slower than the baseline by more than this part is a regression, after the calibration
+CALIBRATION_LOOPS = 100000
+STARTUP_CODE = 'from Texas_holdem import play_hand; play_hand(4)'
+STARTUP_RUNS = 20
+STARTUP_BUDGET = 0.03  # seconds a new process may take on top of starting the interpreter
+
+# how many of the 133,784,560 7-card hands make every hand type
+ALL_HANDS_COUNTS = [23294460, 58627800, 31433400, 6461620, 6180020, 4047644, 3473184, 224848, 41584]
+
+BENCHMARKS = []
+
+
+def benchmark(function):
+    # a benchmark builds its corpus and returns a function that runs the corpus and the number of hands in it
+    BENCHMARKS.append(function)
+    return function
+
+
+def deal_players(deck, number_of_players):
+    players = [Player(deck, number) for number in range(1, number_of_players + 1)]
+    for player in players:
+        player.cards.clear()
+        player.cards.append(deck.draw_cards(2))
+    return players
+
+
+def showdowns(count, rng, ties_only=False):
+    # (players, river) with 3-10 players; ties_only keeps the showdowns that end in a split pot
+    corpus = []
+    while len(corpus) < count:
+        deck = Deck(rng=rng)
+        players = deal_players(deck, rng.randint(3, 10))
+        river = deck.draw_cards(5)
+        if ties_only:
+            values = [evaluate(card_numbers(river) + card_numbers(player.cards[0])) for player in players]
+            if values.count(max(values)) < 2:
+                continue
+        corpus.append((players, river))
+    return corpus
+
+
+@benchmark
+def new_deck():
+    rng = Random(SEED)
+
+    def run():
+        for _ in range(20000):
+            Deck(rng=rng)
+    return run, 20000
+
+
+@benchmark
+def draw_cards():
+    decks = [Deck(rng=Random(SEED + idx)) for idx in range(5000)]
+
+    def run():
+        for deck in decks:
+            cards = deck.cards.copy()
+            for _ in range(10):
+                deck.draw_cards(2)
+            deck.draw_cards(5)
+            deck.cards = cards
+    return run, 5000
+
+
+@benchmark
+def make_combination():
+    rng = Random(SEED)
+    corpus = []
+    for _ in range(20000):
+        deck = Deck(rng=rng)
+        corpus.append((deal_players(deck, 1)[0], deck.draw_cards(5)))
+
+    def run():
+        game = Game(verbose=False)
+        for player, river in corpus:
+            game.make_combination(player, river)
+    return run, len(corpus)
+
+
+@benchmark
+def street_evaluation():
+    # i_forgot_about_the_street_but_its_too_late on random showdowns, counted per player
+    corpus = showdowns(3000, Random(SEED))
+
+    def run():
+        game = Game(verbose=False)
+        for players, river in corpus:
+            game.i_forgot_about_the_street_but_its_too_late(players, river)
+    return run, sum(len(players) for players, river in corpus)
+
+
+@benchmark
+def define_winner():
+    corpus = showdowns(3000, Random(SEED))
+
+    def run():
+        for players, river in corpus:
+            game = Game(verbose=False)
+            game.river = river
+            game.define_winner(players)
+    return run, len(corpus)
+
+
+@benchmark
+def define_winner_ties():
+    corpus = showdowns(1000, Random(SEED), ties_only=True)
+
+    def run():
+        for players, river in corpus:
+            game = Game(verbose=False)
+            game.river = river
+            game.define_winner(players)
+    return run, len(corpus)
+
+
+@benchmark
+def settlement():
+    # side pots of 10-handed hands where several short stacks are all-in, and their showdown
+    rng = Random(SEED)
+    corpus = []
+    for _ in range(5000):
+        chips = Chips([rng.choice([20, 50, 100, 400, 1000]) for _ in range(10)])
+        for seat in range(1, 11):
+            if rng.random() < 0.2:
+                chips.fold(seat)
+            chips.put_to(seat, rng.choice([10, 40, 400, 1000]))
+        corpus.append((chips, {seat: rng.randint(0, 3) for seat in range(1, 11) if not chips.folded[seat - 1]}))
+
+    def run():
+        for chips, values in corpus:
+            chips.settle(values, 1)
+    return run, len(corpus)
+
+
+@benchmark
+def full_hand():
+    def run():
+        rng = Random(SEED)
+        for idx in range(1000):
+            play_hand(3 + idx % 8, rng=rng)
+    return run, 1000
+
+
+def measure(function, repeats=7):
+    # CPython does not count allocations, so tracemalloc gives the memory a run needed on top of its corpus
+    # at the worst moment, and what stayed allocated per hand after it (caches, leaks).
+    # The calibration loop runs before every repeat, so both see the machine as busy as it was
+    run, hands = function()
+    seconds = []
+    loop_seconds = []
+    for _ in range(repeats):
+        loop_seconds.append(timing(calibration_loop))
+        seconds.append(timing(run))
+    tracemalloc.start()
+    run()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'hands_per_second': hands / min(seconds), 'peak_bytes': peak, 'retained_bytes_per_hand': retained / hands,
+            'loops_per_second': CALIBRATION_LOOPS / min(loop_seconds)}
+
+
+def calibration_loop():
+    # a fixed loop of what the game code does most: int arithmetic, lists, dicts and calls
+    values = list(range(64))
+    counts = {}
+    for idx in range(CALIBRATION_LOOPS):
+        value = _step(values, idx) & 1023
+        counts[value] = counts.get(value, 0) + 1
+        values[idx & 63] = value
+
+
+def _step(values, idx):
+    return values[idx & 63] + idx
+
+
+def timing(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def all_hands():
+    # every 7-card hand once, evaluated in NumPy batches: the two lowest cards are fixed, the other five vary
+    import numpy as np
+    from batch_evaluator import evaluate_batch
+    from equity import all_combinations
+
+    counts = np.zeros(len(HAND_NAMES), dtype=np.int64)
+    hands = 0
+    loop_seconds = [timing(calibration_loop) for _ in range(3)]
+    start = time.perf_counter()
+    for first in range(52):
+        for second in range(first + 1, 47):
+            rest = all_combinations(51 - second, 5) + (second + 1)
+            cards = np.empty((len(rest), 7), dtype=np.intp)
+            cards[:, 0] = first
+            cards[:, 1] = second
+            cards[:, 2:] = rest
+            counts += np.bincount(category(evaluate_batch(cards)), minlength=len(HAND_NAMES))
+            hands += len(rest)
+    seconds = time.perf_counter() - start
+    loop_seconds.extend(timing(calibration_loop) for _ in range(3))
+    if counts.tolist() != ALL_HANDS_COUNTS:
+        raise AssertionError(f'wrong hand type counts: {counts.tolist()}')
+    return {'hands_per_second': hands / seconds, 'peak_bytes': 0, 'retained_bytes_per_hand': 0.0,
+            'loops_per_second': CALIBRATION_LOOPS / min(loop_seconds)}
+
+
+def startup(runs=STARTUP_RUNS):
+    # the best of `runs` new processes that import the game and play one hand, and how much of it is more
+    # than starting an interpreter that does nothing. The evaluation cache file is written first if it is
+    # missing, a short-lived worker is meant to find it there
+    from evalcache import EvalCache
+    EvalCache().close()
+
+    def best(code):
+        seconds = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=DIRECTORY, check=True)
+            seconds.append(time.perf_counter() - start)
+        return min(seconds)
+
+    total = best(STARTUP_CODE)
+    return total, total - best('pass')
+
+
+def compare(results, baseline):
+    # the regressions; a baseline speed without its loop speed may come from any machine and is only reported
+    regressions = []
+    for name, result in results.items():
+        line = (f'{name:22} {result["hands_per_second"]:12,.0f} hands/s {result["peak_bytes"]:12,} B peak '
+                f'{result["retained_bytes_per_hand"]:8,.1f} B/hand kept')
+        if name in baseline:
+            ratio = result['hands_per_second'] / baseline[name]['hands_per_second']
+            if 'loops_per_second' not in baseline[name]:
+                line += f'   x{ratio:.2f} of baseline, not calibrated'
+            else:
+                ratio /= result['loops_per_second'] / baseline[name]['loops_per_second']
+                line += f'   x{ratio:.2f} of baseline'
+                if ratio < 1 - TOLERANCE:
+                    line += '   REGRESSION'
+                    regressions.append(name)
+        print(line)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--save', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--all-hands', action='store_true', help='evaluate all 133,784,560 7-card hands')
+    parser.add_argument('--startup', action='store_true', help='time a new process playing one hand')
+    args = parser.parse_args()
+
+    if args.startup:
+        total, extra = startup()
+        print(f'{"startup":22} {total * 1000:12.1f} ms, {extra * 1000:.1f} ms above the bare interpreter, '
+              f'budget {STARTUP_BUDGET * 1000:.0f} ms')
+        if extra > STARTUP_BUDGET:
+            raise SystemExit('the startup is over its budget')
+
+    results = {function.__name__: measure(function) for function in BENCHMARKS}
+    if args.all_hands:
+        results['all_7_card_hands'] = all_hands()
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as file:
+            baseline = json.load(file)
+    regressions = compare(results, baseline)
+    if args.save:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+    elif regressions:
+        raise SystemExit(f'slower than the baseline: {", ".join(regressions)}')
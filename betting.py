@@ -0,0 +1,175 @@
+# Betting rounds for 2-10 players as a state machine. The seats are a ring that never changes during a hand:
+# bit seat - 1 of a mask is one seat, `live` holds the players who have not folded and `pending` the ones who
+# still have to act before the street is over. Finding the next player is a couple of bit operations, a fold
+# clears a bit instead of renumbering anyone, and the street ends when nobody is pending, that is when everyone
+# still in has matched the biggest stake or is all-in. A raise doubles the stake to match. Game plays its
+# hands on one, the players' strategies act on it through the Game's action methods.
+#   betting = Betting(chips, button=3, small_blind=1, big_blind=2)
+#   while not betting.hand_over():
+#       if betting.street_over():
+#           betting.next_street()
+#       else:
+#           betting.act('call')
+from events import ACTION_KINDS, BLIND, NULL_SINK
+
+MIN_PLAYERS = 2
+MAX_PLAYERS = 10
+MAX_RAISES = 4  # a raise and three reraises on a street
+STREETS = ['preflop', 'flop', 'turn', 'river']
+
+
+def next_seat(mask, seat):
+    # the first seat of the mask after `seat` going round the table, 0 when the mask is empty
+    after = mask >> seat << seat
+    if not after:
+        after = mask
+    return (after & -after).bit_length()
+
+
+def blind_seats(seated, button):
+    # the small and the big blind of the seats dealt in: heads-up the button posts the small blind
+    # and acts first before the flop, otherwise the two seats after the button post them
+    if seated.bit_count() == 2 and seated >> button - 1 & 1:
+        small_blind = button
+    else:
+        small_blind = next_seat(seated, button)
+    return small_blind, next_seat(seated, small_blind)
+
+
+class Betting:
+    def __init__(self, chips, button, small_blind, big_blind, seated=None, events=NULL_SINK, hand=0):
+        # chips: the Chips of all seats; seated: the mask of the seats dealt in, every seat with chips by default
+        if seated is None:
+            seated = sum(1 << idx for idx, stack in enumerate(chips.stacks) if stack > 0)
+        if not MIN_PLAYERS <= seated.bit_count() <= MAX_PLAYERS:
+            raise ValueError(f'{seated.bit_count()} players, a table has {MIN_PLAYERS}-{MAX_PLAYERS}')
+        self.chips = chips
+        self.events = events
+        self.hand = hand
+        self.button = button
+        self.big_blind_stake = big_blind
+        self.live = seated
+        self.all_in = 0
+        self.street = 0
+        self.raises = 0
+        self.closed = 0  # the players who acted before a short all-in, they may call it but not raise
+        self.small_blind, self.big_blind = blind_seats(seated, button)
+        self.post(self.small_blind, small_blind)
+        self.post(self.big_blind, big_blind)
+        self.stake = big_blind  # to match on this street
+        self.pending = self.can_act()
+        self.to_act = next_seat(self.pending, self.big_blind)
+        self.settle_pending()
+
+    def post(self, seat, blind):
+        stake = self.put(seat, blind)
+        self.events.emit(self.hand, BLIND, seat, stake, 0)
+
+    def put(self, seat, stake):
+        stake = self.chips.put_to(seat, stake)
+        if self.chips.stacks[seat - 1] == 0:
+            self.all_in |= 1 << seat - 1
+        return stake
+
+    def can_act(self):
+        return self.live & ~self.all_in
+
+    def settle_pending(self):
+        # nobody acts when one player at most can and he owes nothing
+        acting = self.can_act()
+        if acting.bit_count() <= 1 and (not acting or self.owes(next_seat(acting, 0)) == 0):
+            self.pending = 0
+
+    def owes(self, seat):
+        return max(self.stake - self.chips.street[seat - 1], 0)
+
+    def raise_name(self):
+        # what a raise of the player to act is called, None when he may not raise: the raises are used up,
+        # nobody else can answer, the action was not reopened for him or all he has does not cover the stake
+        seat = self.to_act
+        if self.raises >= MAX_RAISES or not self.can_act() & ~(1 << seat - 1) or self.closed >> seat - 1 & 1 or \
+                self.chips.stacks[seat - 1] <= self.owes(seat):
+            return None
+        return 'reraise' if self.raises else 'raise'
+
+    def legal(self):
+        actions = ['fold', 'call'] if self.owes(self.to_act) else ['check']
+        raise_name = self.raise_name()
+        if raise_name is not None:
+            actions.append(raise_name)
+        return actions
+
+    def act(self, action):
+        seat = self.to_act
+        bit = 1 << seat - 1
+        if action in ('raise', 'reraise'):
+            if self.raise_name() is None:
+                raise ValueError(f'seat {seat} may not raise')
+            action = self.raise_name()
+            stake = self.stake
+            target = stake * 2 if stake else self.big_blind_stake
+            total = self.put(seat, target)
+            if total >= target or not stake:
+                # a full raise, or the first bet of the street: everybody else has to answer it
+                self.stake = total
+                self.raises += 1
+                self.pending = self.can_act() & ~bit
+                self.closed = 0
+            elif total > stake:
+                # an all-in short of a full raise does not reopen the action: who has acted may only call the rest
+                self.stake = total
+                self.closed |= self.can_act() & ~self.pending
+                self.pending = self.can_act() & ~bit
+                self.closed &= self.pending
+            else:
+                # an all-in that does not even match the stake is a call
+                action = 'call'
+                self.pending &= ~bit
+        elif action == 'fold':
+            self.live &= ~bit
+            self.chips.fold(seat)
+            self.pending &= ~bit
+        elif action == 'call':
+            self.put(seat, self.stake)
+            self.pending &= ~bit
+        elif action == 'check':
+            if self.owes(seat):
+                raise ValueError(f'seat {seat} cannot check, he owes {self.owes(seat)}')
+            self.pending &= ~bit
+        else:
+            raise ValueError(f'unknown action {action}')
+        self.events.emit(self.hand, ACTION_KINDS[action], seat, self.chips.street[seat - 1], 0)
+        if self.pending:
+            self.to_act = next_seat(self.pending, seat)
+        return action
+
+    def street_over(self):
+        return not self.pending
+
+    def hand_over(self):
+        return self.live.bit_count() == 1 or (self.street == len(STREETS) - 1 and not self.pending)
+
+    def next_street(self):
+        # the stakes go to the pot, the first player left of the button acts first
+        self.chips.end_street()
+        self.street += 1
+        self.stake = 0
+        self.raises = 0
+        self.closed = 0
+        self.pending = self.can_act()
+        self.to_act = next_seat(self.pending, self.button)
+        self.settle_pending()
+
+    def seats(self, mask):
+        seats = []
+        while mask:
+            low = mask & -mask
+            seats.append(low.bit_length())
+            mask ^= low
+        return seats
+
+    def __str__(self):
+        return f'Betting {STREETS[self.street]}: to act {self.to_act}, stake {self.stake}, live {self.live:b}'
+
+    def __repr__(self):
+        return str(self)
@@ -0,0 +1,91 @@
+# Chip stacks and the pot of one hand: what every seat has put in on every street, all-ins, and the side pots
+# at the showdown. Everything is whole chips, what the players put in is exactly what the winners get.
+# Lists are indexed by seat - 1
+
+
+class Chips:
+    def __init__(self, stacks):
+        self.stacks = list(stacks)  # chips behind
+        self.total = [0] * len(self.stacks)  # put in during this hand
+        self.street = [0] * len(self.stacks)  # put in on the current street
+        self.streets = []  # self.street of every finished street
+        self.folded = [False] * len(self.stacks)
+
+    def new_hand(self):
+        # the stacks stay, what was put in goes, the lists are the same ones
+        for idx in range(len(self.stacks)):
+            self.total[idx] = 0
+            self.street[idx] = 0
+            self.folded[idx] = False
+        self.streets.clear()
+
+    def put_to(self, seat, stake):
+        # the stake of the seat on this street becomes `stake`, a short stack puts in what it has and is all-in
+        idx = seat - 1
+        chips = min(stake - self.street[idx], self.stacks[idx])
+        if chips > 0:
+            self.stacks[idx] -= chips
+            self.street[idx] += chips
+            self.total[idx] += chips
+        return self.street[idx]
+
+    def all_in(self, seat):
+        return self.stacks[seat - 1] == 0 and not self.folded[seat - 1]
+
+    def fold(self, seat):
+        self.folded[seat - 1] = True
+
+    def end_street(self):
+        self.streets.append(self.street)
+        self.street = [0] * len(self.stacks)
+
+    def amount(self):
+        return sum(self.total)
+
+    def side_pots(self):
+        # [chips, seats that can win them], the main pot first. One pass over the seats from the biggest
+        # contribution down: every layer between two contributions is paid by everybody above it
+        # and can be won by whoever of them has not folded
+        order = sorted(range(len(self.total)), key=self.total.__getitem__, reverse=True)
+        pots = []
+        live = []
+        carried = 0  # what folded players put in above everyone still in the hand
+        for idx, player in enumerate(order):
+            if not self.folded[player]:
+                live.append(player + 1)
+            lower = self.total[order[idx + 1]] if idx + 1 < len(order) else 0
+            if lower == self.total[player]:
+                continue  # the next seat put in as much, the layer is his too
+            chips = (self.total[player] - lower) * (idx + 1) + carried
+            if not live:
+                carried = chips
+                continue
+            carried = 0
+            if pots and len(pots[-1][1]) == len(live):
+                pots[-1][0] += chips
+            else:
+                pots.append([chips, live.copy()])
+        pots.reverse()
+        return pots
+
+    def settle(self, values, button=0):
+        # values: seat -> hand value of everyone at the showdown. Equal values split a pot, the odd chips
+        # go one by one to the winners sitting first to the left of the button. Returns the chips won by seat - 1
+        seats = len(self.stacks)
+        won = [0] * seats
+        pots = self.side_pots()
+        if not pots and any(self.total):  # everybody has folded, nobody can win
+            won = self.total.copy()
+        for chips, eligible in pots:
+            best = max(values.get(seat, -1) for seat in eligible)
+            winners = [seat for seat in eligible if values.get(seat, -1) == best]
+            share, odd = divmod(chips, len(winners))
+            for seat in winners:
+                won[seat - 1] += share
+            if odd:
+                winners.sort(key=lambda seat: (seat - button - 1) % seats)
+                for seat in winners[:odd]:
+                    won[seat - 1] += 1
+        for idx in range(seats):
+            self.stacks[idx] += won[idx]
+        return won
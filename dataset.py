@@ -0,0 +1,132 @@
+# Hands for training sets, as fixed-width records in NumPy .npy shards. Everything is a generator, from the seeds
+# to the rows, and a shard is the only thing held in memory. Hand number N is always dealt from the same seed,
+# so an export stopped at any point resumes from the checkpoint and gives the same files.
+#   python dataset.py DIRECTORY HANDS [--players 6] [--workers N]
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+
+import numpy as np
+
+from events import DEAL, STREET, NullSink
+from Texas_holdem import mask_numbers, play_hand
+
+# one row per seat and hand, 21 bytes; 255 for a board card that was not dealt, rank -1 without a showdown
+RECORD = np.dtype([('hand', '<u8'), ('seat', 'u1'), ('hole', 'u1', 2), ('board', 'u1', 5), ('rank', '<i4'),
+                   ('winner', 'u1')])
+EMPTY = 255
+SHARD_HANDS = 1 << 16
+CHECKPOINT = 'checkpoint.json'
+
+
+class CardsSink(NullSink):
+    # the hole cards of every seat and the board, also of the players who fold
+    def __init__(self):
+        self.hole = {}
+        self.board = 0
+
+    def emit(self, hand, kind, seat, amount, cards):
+        if kind == DEAL:
+            self.hole[seat] = cards
+        elif kind == STREET:
+            self.board = cards
+
+
+def hand_seed(seed, number):
+    return Random(f'{seed}:{number}').getrandbits(64)
+
+
+def hands(number_of_players, seed, start, stop):
+    # (hand number, game, players left, cards) of the hands start to stop - 1
+    for number in range(start, stop):
+        cards = CardsSink()
+        game, players = play_hand(number_of_players, rng=Random(hand_seed(seed, number)), events=cards, hand=number)
+        yield number, game, players, cards
+
+
+def rows(played):
+    # a row for every seat of every hand
+    for number, game, players, cards in played:
+        # the players left have a rank when there was a showdown, a hand won by folds has none
+        ranks = {player.seat: player.hand_rank for player in players} if len(players) > 1 else {}
+        winners = {player.seat for player in game.winners or [game.winner] if player is not None}
+        board = mask_numbers(cards.board)
+        board = tuple(board + [EMPTY] * (5 - len(board)))
+        for seat in sorted(cards.hole):
+            rank = ranks.get(seat)
+            yield number, seat, tuple(mask_numbers(cards.hole[seat])), board, -1 if rank is None else rank, \
+                seat in winners
+
+
+def write_shard(directory, index, number_of_players, seed, start, stop):
+    # plays the hands of one shard straight into its array, then writes the file in one piece
+    shard = np.empty((stop - start) * number_of_players, dtype=RECORD)
+    count = 0
+    for count, row in enumerate(rows(hands(number_of_players, seed, start, stop)), 1):
+        shard[count - 1] = row
+    path = os.path.join(directory, f'hands-{index:06d}.npy')
+    with open(path + '.tmp', 'wb') as file:
+        np.save(file, shard[:count])
+    os.replace(path + '.tmp', path)
+    return stop
+
+
+def read_checkpoint(directory, number_of_players, seed, shard_hands):
+    path = os.path.join(directory, CHECKPOINT)
+    if not os.path.exists(path):
+        return 0
+    with open(path) as file:
+        checkpoint = json.load(file)
+    if (checkpoint['players'], checkpoint['seed'], checkpoint['shard_hands']) != (number_of_players, seed, shard_hands):
+        raise ValueError(f'{directory} holds an export with other settings: {checkpoint}')
+    return checkpoint['next_hand']
+
+
+def write_checkpoint(directory, number_of_players, seed, shard_hands, next_hand):
+    path = os.path.join(directory, CHECKPOINT)
+    with open(path + '.tmp', 'w') as file:
+        json.dump({'players': number_of_players, 'seed': seed, 'shard_hands': shard_hands, 'next_hand': next_hand},
+                  file)
+    os.replace(path + '.tmp', path)
+
+
+def export(directory, count, number_of_players=6, seed=0, workers=None, shard_hands=SHARD_HANDS):
+    # the hands 0 to count - 1 in shards of shard_hands hands, on `workers` processes. The checkpoint moves on
+    # when a shard and all the shards before it are written, so a restart repeats at most the unfinished ones
+    os.makedirs(directory, exist_ok=True)
+    next_hand = read_checkpoint(directory, number_of_players, seed, shard_hands)
+    first = next_hand // shard_hands
+    shards = [(index, index * shard_hands, min((index + 1) * shard_hands, count))
+              for index in range(first, -(-count // shard_hands))]
+    if workers == 1:
+        for index, start, stop in shards:
+            next_hand = write_shard(directory, index, number_of_players, seed, start, stop)
+            write_checkpoint(directory, number_of_players, seed, shard_hands, next_hand)
+        return next_hand
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        done = pool.map(write_shard, [directory] * len(shards), [index for index, start, stop in shards],
+                        [number_of_players] * len(shards), [seed] * len(shards),
+                        [start for index, start, stop in shards], [stop for index, start, stop in shards])
+        for next_hand in done:  # in the order of the shards
+            write_checkpoint(directory, number_of_players, seed, shard_hands, next_hand)
+    return next_hand
+
+
+def read_shards(directory):
+    # the shards one by one, memory-mapped
+    for name in sorted(os.listdir(directory)):
+        if name.startswith('hands-') and name.endswith('.npy'):
+            yield np.load(os.path.join(directory, name), mmap_mode='r')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory')
+    parser.add_argument('hands', type=int)
+    parser.add_argument('--players', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    print(export(args.directory, args.hands, args.players, args.seed, args.workers), 'hands exported')
@@ -0,0 +1,205 @@
+# Win probability of every player's hole cards: estimated by dealing random runouts in NumPy batches,
+# or exact by going through every way to finish the board
+import math
+from functools import lru_cache
+from itertools import permutations
+
+import numpy as np
+
+from batch_evaluator import CARD_RANK_KEYS, CARD_SUIT_KEYS, evaluate_keys
+from Texas_holdem import card_mask, card_numbers
+
+CHUNK = 1 << 17  # runouts per batch, it keeps memory bounded whatever n_samples is
+Z = 1.96  # 95% confidence intervals
+
+
+class Equity:
+    def __init__(self, wins, ties, shares, squares, samples, exact=False):
+        self.samples = samples
+        self.exact = exact
+        self.win = float(wins) / samples
+        self.tie = float(ties) / samples
+        self.loss = max(1 - self.win - self.tie, 0.0)
+        # a tie pays an equal share of the pot, the equity is the average share
+        self.equity = float(shares) / samples
+        self.win_ci = self.interval(self.win)
+        self.tie_ci = self.interval(self.tie)
+        self.loss_ci = self.interval(self.loss)
+        deviation = math.sqrt(max(float(squares) / samples - self.equity ** 2, 0) / samples)
+        if exact:
+            deviation = 0
+        self.equity_ci = (max(self.equity - Z * deviation, 0), min(self.equity + Z * deviation, 1))
+
+    def interval(self, rate):
+        if self.exact:
+            return rate, rate
+        deviation = Z * math.sqrt(rate * (1 - rate) / self.samples)
+        return max(rate - deviation, 0), min(rate + deviation, 1)
+
+    def __str__(self):
+        return f'Equity {self.equity:.4f}: win {self.win:.4f}, tie {self.tie:.4f}, loss {self.loss:.4f}'
+
+    def __repr__(self):
+        return str(self)
+
+
+def deal_runouts(remaining, count, samples, rng):
+    # every row is `count` different cards of `remaining`: draw with repeats, then redraw the rows that have one
+    draws = rng.integers(0, remaining.size, size=(samples, count))
+    rows = np.arange(samples)
+    while count > 1 and rows.size:
+        ordered = np.sort(draws[rows], axis=1)
+        rows = rows[(ordered[:, 1:] == ordered[:, :-1]).any(axis=1)]
+        draws[rows] = rng.integers(0, remaining.size, size=(rows.size, count))
+    return remaining[draws]
+
+
+def showdown_stats(values, weights=None):
+    # values: (players, samples) hand values, returns per player wins, ties, pot shares and their squares
+    best = values.max(axis=0)
+    winners = values == best
+    count = winners.sum(axis=0)
+    share = np.where(winners, 1.0 / count, 0.0)
+    if weights is None:
+        weights = np.ones(values.shape[1])
+    return (winners & (count == 1)) @ weights, (winners & (count > 1)) @ weights, share @ weights, (share * share) @ weights
+
+
+def equity(hole_cards_per_player, board=(), dead_cards=(), n_samples=100000, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    hands = [card_numbers(hand) for hand in hole_cards_per_player]
+    board = card_numbers(board)
+    used = card_mask(board) | card_mask(dead_cards)
+    for hand in hands:
+        if len(hand) != 2:
+            raise ValueError('Every player needs two hole cards')
+        if used & card_mask(hand):
+            raise ValueError('A card is dealt twice')
+        used = used | card_mask(hand)
+    if len(board) > 5:
+        raise ValueError('The board has at most 5 cards')
+    remaining = np.array([number for number in range(52) if not used >> number & 1], dtype=np.intp)
+    missing = 5 - len(board)
+    if missing == 0:
+        n_samples = 1  # nothing left to deal, one showdown is the exact answer
+
+    hands = np.array(hands, dtype=np.intp)
+    hole_rank_keys = CARD_RANK_KEYS[hands].sum(axis=1)
+    hole_suit_keys = CARD_SUIT_KEYS[hands].sum(axis=1)
+    totals = np.zeros((4, len(hands)))
+    done = 0
+    while done < n_samples:
+        size = min(CHUNK, n_samples - done)
+        board_cards = np.empty((size, 5), dtype=np.intp)
+        board_cards[:, :len(board)] = board
+        board_cards[:, len(board):] = deal_runouts(remaining, missing, size, rng)
+        board_rank_keys = CARD_RANK_KEYS[board_cards].sum(axis=1)
+        board_suit_keys = CARD_SUIT_KEYS[board_cards].sum(axis=1)
+        values = np.empty((len(hands), size), dtype=np.int32)
+        cards = np.empty((size, 7), dtype=np.intp)
+        cards[:, :5] = board_cards
+        for idx, hand in enumerate(hands):
+            cards[:, 5:] = hand
+            values[idx] = evaluate_keys(board_rank_keys + hole_rank_keys[idx],
+                                        board_suit_keys + hole_suit_keys[idx], cards)
+        totals += showdown_stats(values)
+        done += size
+    wins, ties, shares, squares = totals
+    return [Equity(wins[idx], ties[idx], shares[idx], squares[idx], n_samples) for idx in range(len(hands))]
+
+
+# Exact equity. Two boards are the same for the players when a swap of suits turns one into the other
+# and leaves the hands where they are, so only one board of every such family is evaluated
+
+SUIT_PERMUTATIONS = list(permutations(range(4)))
+# the card every card becomes under every permutation of suits
+PERMUTED_CARDS = [[suits[number // 13] * 13 + number % 13 for number in range(52)] for suits in SUIT_PERMUTATIONS]
+CARD_BITS = np.uint64(1) << np.arange(52, dtype=np.uint64)
+
+
+def _permuted_key(cards, hands, board, dead):
+    return (tuple(tuple(sorted(cards[number] for number in hand)) for hand in hands),
+            tuple(sorted(cards[number] for number in board)),
+            tuple(sorted(cards[number] for number in dead)))
+
+
+def canonical_key(hands, board=(), dead=()):
+    # the smallest (hands, board, dead cards) any suit permutation makes, the order of the players is kept
+    return min(_permuted_key(cards, hands, board, dead) for cards in PERMUTED_CARDS)
+
+
+def exact_equity(hole_cards_per_player, board=(), dead_cards=()):
+    hands = [card_numbers(hand) for hand in hole_cards_per_player]
+    board = card_numbers(board)
+    dead = card_numbers(dead_cards)
+    used = card_mask(board) | card_mask(dead)
+    for hand in hands:
+        if len(hand) != 2:
+            raise ValueError('Every player needs two hole cards')
+        if used & card_mask(hand):
+            raise ValueError('A card is dealt twice')
+        used = used | card_mask(hand)
+    if len(board) > 5:
+        raise ValueError('The board has at most 5 cards')
+    return _exact_equity(canonical_key(hands, board, dead))
+
+
+def all_combinations(count, size):
+    # every `size` of range(count) as rows of an array, in the order of itertools.combinations
+    rows = np.zeros((1, 0), dtype=np.int16)
+    for column in range(size):
+        if column == 0:
+            last = np.full(1, -1)
+        else:
+            last = rows[:, -1].astype(np.intp)
+        # every row grows by each number above its last one, but only if the row can still be finished
+        extensions = np.maximum(count - (size - column - 1) - 1 - last, 0)
+        starts = np.repeat(last + 1 - (np.cumsum(extensions) - extensions), extensions)
+        grown = np.arange(extensions.sum()) + starts
+        rows = np.hstack([np.repeat(rows, extensions, axis=0), grown[:, None].astype(np.int16)])
+    return rows
+
+
+@lru_cache(maxsize=1 << 16)
+def _exact_equity(key):
+    hands, board, dead = key
+    stabilizer = [np.array(cards) for cards in PERMUTED_CARDS if _permuted_key(cards, hands, board, dead) == key]
+    used = card_mask(board) | card_mask(dead)
+    for hand in hands:
+        used = used | card_mask(hand)
+    remaining = np.array([number for number in range(52) if not used >> number & 1], dtype=np.intp)
+    # the flop, turn and river still to come, in the columns Game deals them to
+    runouts = all_combinations(remaining.size, 5 - len(board))
+
+    hands = np.array(hands, dtype=np.intp)
+    hole_rank_keys = CARD_RANK_KEYS[hands].sum(axis=1)
+    hole_suit_keys = CARD_SUIT_KEYS[hands].sum(axis=1)
+    totals = np.zeros((4, len(hands)))
+    total = 0
+    for start in range(0, len(runouts), CHUNK):
+        board_cards = np.empty((min(CHUNK, len(runouts) - start), 5), dtype=np.intp)
+        board_cards[:, :len(board)] = board
+        board_cards[:, len(board):] = remaining[runouts[start:start + CHUNK]]
+        weights = np.ones(len(board_cards))
+        if len(stabilizer) > 1:
+            # keep the board with the smallest mask of its family and count how big the family is
+            masks = CARD_BITS[board_cards].sum(axis=1)
+            images = np.stack([CARD_BITS[cards[board_cards]].sum(axis=1) for cards in stabilizer])
+            smallest = (images >= masks).all(axis=0)
+            board_cards = board_cards[smallest]
+            weights = len(stabilizer) / (images[:, smallest] == masks[smallest]).sum(axis=0)
+        board_rank_keys = CARD_RANK_KEYS[board_cards].sum(axis=1)
+        board_suit_keys = CARD_SUIT_KEYS[board_cards].sum(axis=1)
+        values = np.empty((len(hands), len(board_cards)), dtype=np.int32)
+        cards = np.empty((len(board_cards), 7), dtype=np.intp)
+        cards[:, :5] = board_cards
+        for idx, hand in enumerate(hands):
+            cards[:, 5:] = hand
+            values[idx] = evaluate_keys(board_rank_keys + hole_rank_keys[idx],
+                                        board_suit_keys + hole_suit_keys[idx], cards)
+        totals += showdown_stats(values, weights)
+        total += weights.sum()
+    wins, ties, shares, squares = totals
+    return tuple(Equity(wins[idx], ties[idx], shares[idx], squares[idx], float(total), exact=True)
+                 for idx in range(len(hands)))
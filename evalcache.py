@@ -0,0 +1,180 @@
+# A file next to the evaluator that every process maps instead of building the evaluator tables again:
+# the tables themselves, then an open-addressed hash of 7-card hands seen before -> their values.
+# A hand is keyed by its canonical mask: the four 13-bit suit groups sorted, so hands that differ only by
+# a swap of suits share one slot. The file has a fixed number of slots, which caps its size; a hand that
+# finds no free slot among PROBES slots evicts one of them. Many processes can map the file at once,
+# readers copy nothing, and a slot is written value first, key second, with a check of the key in the value
+# word, so a reader racing a writer sees a miss, never a wrong value.
+# File layout (little endian): the 32-byte header '<4sHHIIIQ4x' (magic, version, probes, crc32 of
+# evaluator.py, rank table size, slot count, offset of the slots), then
+#   the rank table keys int64 and values int32, FLUSH_TABLE int32, FLUSH_SUIT int8, BIT_COUNT uint8,
+#   BITS_RANK_KEY int64, and from the 16-byte aligned offset the slots: key uint64, check << 32 | value uint64
+#   python evalcache.py [MEGABYTES]
+import mmap
+import os
+import struct
+import zlib
+
+HEADER = struct.Struct('<4sHHIIIQ4x')
+MAGIC = b'EVAL'
+VERSION = 1
+PROBES = 8
+RANK_MASK = 0x1fff
+FLUSH_SIZE = RANK_MASK + 1
+SUIT_KEYS_SIZE = 1 << 12
+DEFAULT_MEGABYTES = 64
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+WORD = (1 << 64) - 1
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(DIRECTORY, 'eval_cache.bin')
+EVALUATOR_PATH = os.path.join(DIRECTORY, 'evaluator.py')
+
+
+def evaluator_crc():
+    # the tables in a file are only good for the evaluator they were built by
+    with open(EVALUATOR_PATH, 'rb') as file:
+        return zlib.crc32(file.read())
+
+
+def canonical_mask(mask):
+    # the suit groups sorted, the biggest on top
+    groups = sorted((mask & RANK_MASK, mask >> 13 & RANK_MASK, mask >> 26 & RANK_MASK, mask >> 39 & RANK_MASK))
+    return groups[3] << 39 | groups[2] << 26 | groups[1] << 13 | groups[0]
+
+
+def _read_header(data, path):
+    magic, version, probes, crc, ranks, slots, offset = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'{path} is not an evaluation cache')
+    return probes, crc, ranks, slots, offset
+
+
+def read_tables(path=CACHE_PATH):
+    # (FLUSH_SUIT, FLUSH_TABLE, BIT_COUNT, BITS_RANK_KEY, (the sorted rank keys, their values)) from the file,
+    # None when there is no file or it was built by another evaluator
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        data = file.read(HEADER.size)
+        try:
+            probes, crc, ranks, slots, offset = _read_header(data, path)
+        except (ValueError, struct.error):
+            return None
+        if crc != evaluator_crc():
+            return None
+        data = memoryview(file.read(offset - HEADER.size))
+    position = 0
+    parts = []
+    for code, count in (('q', ranks), ('i', ranks), ('i', FLUSH_SIZE), ('b', SUIT_KEYS_SIZE), ('B', FLUSH_SIZE),
+                        ('q', FLUSH_SIZE)):
+        size = count * struct.calcsize(code)
+        parts.append(data[position:position + size].cast(code))
+        position += size
+    keys, values, flush_table, flush_suit, bit_count, bits_rank_key = parts
+    return flush_suit.tolist(), flush_table.tolist(), bit_count.tolist(), bits_rank_key.tolist(), (keys, values)
+
+
+def write_cache(path=CACHE_PATH, megabytes=DEFAULT_MEGABYTES):
+    # a new file with the tables of the evaluator and empty slots, as many as fit in `megabytes`
+    from array import array
+    from evaluator import BIT_COUNT, BITS_RANK_KEY, FLUSH_SUIT, FLUSH_TABLE, RANK_TABLE
+    keys = sorted(RANK_TABLE)
+    tables = b''.join((array('q', keys).tobytes(), array('i', [RANK_TABLE[key] for key in keys]).tobytes(),
+                       array('i', FLUSH_TABLE).tobytes(), array('b', FLUSH_SUIT).tobytes(),
+                       array('B', BIT_COUNT).tobytes(), array('q', BITS_RANK_KEY).tobytes()))
+    offset = -(-(HEADER.size + len(tables)) // 16) * 16
+    slots = 1 << max((megabytes << 20) // 16, 1).bit_length() - 1
+    with open(path + '.tmp', 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, PROBES, evaluator_crc(), len(keys), slots, offset))
+        file.write(tables)
+        file.truncate(offset + slots * 16)  # the slots are a hole in the file until they are written
+    os.replace(path + '.tmp', path)
+
+
+class EvalCache:
+    def __init__(self, path=CACHE_PATH, megabytes=DEFAULT_MEGABYTES):
+        # maps the file, writing a new one first when there is none or the evaluator changed
+        if read_tables(path) is None:
+            write_cache(path, megabytes)
+        with open(path, 'r+b') as file:
+            self.map = mmap.mmap(file.fileno(), 0)
+        self.probes, crc, ranks, slots, offset = _read_header(self.map, path)
+        self.shift = 64 - (slots.bit_length() - 1)
+        self.mask = slots - 1
+        self.words = memoryview(self.map)[offset:offset + slots * 16].cast('Q')
+        self.hits = 0
+        self.misses = 0
+
+    def _slot(self, key):
+        hashed = key * HASH_MULTIPLIER & WORD
+        return hashed >> self.shift if self.shift < 64 else 0, hashed & 0xffffffff
+
+    def get(self, mask):
+        # the value of a 7-card mask, or None
+        key = canonical_mask(mask)
+        slot, check = self._slot(key)
+        words = self.words
+        for probe in range(self.probes):
+            idx = (slot + probe & self.mask) * 2
+            found = words[idx]
+            if found == key:
+                value = words[idx + 1]
+                if value >> 32 == check:
+                    self.hits += 1
+                    return value & 0xffffffff
+                break
+            if found == 0:
+                break
+        self.misses += 1
+        return None
+
+    def put(self, mask, value):
+        key = canonical_mask(mask)
+        slot, check = self._slot(key)
+        words = self.words
+        victim = None
+        for probe in range(self.probes):
+            idx = (slot + probe & self.mask) * 2
+            found = words[idx]
+            if found == key or found == 0:
+                victim = idx
+                break
+        if victim is None:
+            # every slot of the window is taken: one of them goes, picked by the key so writers spread out
+            victim = (slot + check % self.probes & self.mask) * 2
+        words[victim] = 0
+        words[victim + 1] = check << 32 | value
+        words[victim] = key
+
+    def evaluate(self, mask):
+        # the value of 7 cards from the cache, evaluated and stored on a miss
+        value = self.get(mask)
+        if value is None:
+            from evaluator import evaluate_mask
+            value = evaluate_mask(mask)
+            self.put(mask, value)
+        return value
+
+    def array(self):
+        # the slots as a NumPy (slots, 2) uint64 view of the mapped file, nothing copied
+        import numpy as np
+        return np.frombuffer(self.words, dtype=np.uint64).reshape(-1, 2)
+
+    def used(self):
+        return sum(1 for idx in range(0, len(self.words), 2) if self.words[idx])
+
+    def close(self):
+        self.words.release()
+        self.map.close()
+
+    def __str__(self):
+        return f'EvalCache {len(self.words) // 2} slots, {self.hits} hits, {self.misses} misses'
+
+    def __repr__(self):
+        return str(self)
+
+
+if __name__ == '__main__':
+    import sys
+    write_cache(megabytes=int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MEGABYTES)
+    print(os.path.getsize(CACHE_PATH), 'bytes,', os.stat(CACHE_PATH).st_blocks * 512, 'on disk')
@@ -0,0 +1,274 @@
+# Lookup-table hand evaluator: any 5, 6 or 7 cards -> one integer, the bigger the better
+# A card is a number 0-51, the same one Card is built from: suit, value = divmod(number, 13)
+from bisect import bisect_left
+
+from evalcache import read_tables
+
+HIGH_CARD = 0
+PAIR = 1
+TWO_PAIRS = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+
+HAND_NAMES = ['High card', 'Pair', 'Two Pairs', 'Three of a kind', 'Straight', 'Flush', 'Full House',
+              'Four of a kind', 'Straight-flush']
+
+RANK_MASK = 0x1fff  # 13 bits, one per value of a suit
+
+# the category sits above five 4-bit ranks, so comparing two hand values is comparing two hands
+CATEGORY_SHIFT = 20
+
+
+def _value(category, ranks):
+    result = category
+    for idx in range(5):
+        result = result << 4
+        if idx < len(ranks):
+            result = result | ranks[idx]
+    return result
+
+
+def category(hand_value):
+    return hand_value >> CATEGORY_SHIFT
+
+
+def hand_name(hand_value):
+    if hand_value >> CATEGORY_SHIFT == STRAIGHT_FLUSH and (hand_value >> 16) & 0xf == 12:
+        return 'Royal Flush'
+    return HAND_NAMES[hand_value >> CATEGORY_SHIFT]
+
+
+# the highest card of every straight with its rank bits, the wheel (A-2-3-4-5) goes last
+STRAIGHTS = [(top, 0x1f << (top - 4)) for top in range(12, 3, -1)] + [(3, 0x100f)]
+
+
+def _straight(rank_bits):
+    for top, bits in STRAIGHTS:
+        if rank_bits & bits == bits:
+            return top
+    return None
+
+
+def _top_ranks(rank_bits, count, skip=()):
+    ranks = []
+    for rank in range(12, -1, -1):
+        if len(ranks) == count:
+            break
+        if rank_bits >> rank & 1 and rank not in skip:
+            ranks.append(rank)
+    return ranks
+
+
+def _best_flush(rank_bits):
+    top = _straight(rank_bits)
+    if top is not None:
+        return _value(STRAIGHT_FLUSH, [top])
+    return _value(FLUSH, _top_ranks(rank_bits, 5))
+
+
+def _best_without_flush(counts):
+    rank_bits = 0
+    quads = []
+    trips = []
+    pairs = []
+    for rank in range(12, -1, -1):
+        if counts[rank]:
+            rank_bits = rank_bits | 1 << rank
+        if counts[rank] == 4:
+            quads.append(rank)
+        elif counts[rank] == 3:
+            trips.append(rank)
+        elif counts[rank] == 2:
+            pairs.append(rank)
+    if quads:
+        return _value(FOUR_OF_A_KIND, [quads[0]] + _top_ranks(rank_bits, 1, quads[:1]))
+    if trips and (len(trips) > 1 or pairs):
+        # with two triples the lower one plays as the pair
+        second = max(trips[1:] + pairs)
+        return _value(FULL_HOUSE, [trips[0], second])
+    top = _straight(rank_bits)
+    if top is not None:
+        return _value(STRAIGHT, [top])
+    if trips:
+        return _value(THREE_OF_A_KIND, [trips[0]] + _top_ranks(rank_bits, 2, trips[:1]))
+    if len(pairs) >= 2:
+        return _value(TWO_PAIRS, pairs[:2] + _top_ranks(rank_bits, 1, pairs[:2]))
+    if pairs:
+        return _value(PAIR, pairs[:1] + _top_ranks(rank_bits, 3, pairs[:1]))
+    return _value(HIGH_CARD, _top_ranks(rank_bits, 5))
+
+
+# Every value adds 5 ** value to the rank key. Nobody holds more than 4 cards of a value,
+# so the key is the rank multiplicities written in base 5 - a perfect hash of them
+RANK_KEY_OF_VALUE = [5 ** value for value in range(13)]
+# every card adds 1 to the 3-bit counter of its suit, 7 cards never overflow it
+SUIT_KEY_OF_SUIT = [1 << 3 * suit for suit in range(4)]
+
+RANK_KEYS = [RANK_KEY_OF_VALUE[number % 13] for number in range(52)]
+SUIT_KEYS = [SUIT_KEY_OF_SUIT[number // 13] for number in range(52)]
+CARD_BITS = [1 << number for number in range(52)]
+
+
+def _rank_table():
+    table = {}
+    counts = [0] * 13
+
+    def fill(rank, cards_left, key):
+        if rank == 13:
+            if cards_left <= 2:  # 5, 6 or 7 cards were placed
+                table[key] = _best_without_flush(counts)
+            return
+        for quantity in range(min(4, cards_left) + 1):
+            counts[rank] = quantity
+            fill(rank + 1, cards_left - quantity, key + quantity * RANK_KEY_OF_VALUE[rank])
+        counts[rank] = 0
+
+    fill(0, 7, 0)
+    return table
+
+
+def build_tables():
+    # the flush suit for every suit key, or -1 when no suit has 5 cards
+    flush_suit = [-1] * (1 << 12)
+    for suits in range(1 << 12):
+        for suit in range(4):
+            if (suits >> 3 * suit) & 7 >= 5:
+                flush_suit[suits] = suit
+    # rank bits of one suit -> the best flush or straight flush made of them
+    flush_table = [0] * (RANK_MASK + 1)
+    # rank bits of one suit -> number of cards and their share of the rank key
+    bit_count = [0] * (RANK_MASK + 1)
+    bits_rank_key = [0] * (RANK_MASK + 1)
+    for bits in range(RANK_MASK + 1):
+        bit_count[bits] = bin(bits).count('1')
+        bits_rank_key[bits] = sum(RANK_KEY_OF_VALUE[value] for value in range(13) if bits >> value & 1)
+        if bit_count[bits] >= 5:
+            flush_table[bits] = _best_flush(bits)
+    # rank key -> the best hand without a flush, for every 5, 6 and 7 card multiset of values
+    return flush_suit, flush_table, bit_count, bits_rank_key, _rank_table()
+
+
+class RankTable(dict):
+    # The rank table read from the evaluation cache file: a dict that starts empty and takes every key
+    # from the sorted keys of the file the first time it is asked for, so a short run does not pay
+    # for 73,775 entries it never looks at. Going through it or asking its size fills it all first
+    __slots__ = ('sorted_keys', 'sorted_values')
+
+    def __init__(self, sorted_keys, sorted_values):
+        super().__init__()
+        self.sorted_keys = sorted_keys
+        self.sorted_values = sorted_values
+
+    def __missing__(self, key):
+        idx = bisect_left(self.sorted_keys, key)
+        if idx == len(self.sorted_keys) or self.sorted_keys[idx] != key:
+            raise KeyError(key)
+        value = self[key] = self.sorted_values[idx]
+        return value
+
+    def fill(self):
+        if dict.__len__(self) < len(self.sorted_keys):
+            self.update(zip(self.sorted_keys.tolist(), self.sorted_values.tolist()))
+
+    def __contains__(self, key):
+        idx = bisect_left(self.sorted_keys, key)
+        return idx < len(self.sorted_keys) and self.sorted_keys[idx] == key
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __len__(self):
+        return len(self.sorted_keys)
+
+    def __iter__(self):
+        self.fill()
+        return super().__iter__()
+
+    def keys(self):
+        self.fill()
+        return super().keys()
+
+    def values(self):
+        self.fill()
+        return super().values()
+
+    def items(self):
+        self.fill()
+        return super().items()
+
+
+# the tables take half a second to build, a process that finds them in the evaluation cache file reads them
+_tables = read_tables()
+if _tables is None:
+    FLUSH_SUIT, FLUSH_TABLE, BIT_COUNT, BITS_RANK_KEY, RANK_TABLE = build_tables()
+else:
+    FLUSH_SUIT, FLUSH_TABLE, BIT_COUNT, BITS_RANK_KEY, (_keys, _values) = _tables
+    RANK_TABLE = RankTable(_keys, _values)
+
+
+def evaluate(cards):
+    key = 0
+    suits = 0
+    mask = 0
+    for number in cards:
+        key += RANK_KEYS[number]
+        suits += SUIT_KEYS[number]
+        mask |= CARD_BITS[number]
+    suit = FLUSH_SUIT[suits]
+    if suit < 0:
+        return RANK_TABLE[key]
+    return FLUSH_TABLE[(mask >> 13 * suit) & RANK_MASK]
+
+
+def evaluate_mask(mask):
+    # the same for a set of cards given as a 52-bit mask
+    key = 0
+    for suit in range(4):
+        bits = (mask >> 13 * suit) & RANK_MASK
+        if BIT_COUNT[bits] >= 5:
+            return FLUSH_TABLE[bits]
+        key += BITS_RANK_KEY[bits]
+    return RANK_TABLE[key]
+
+
+class HandState:
+    # A player's cards as the evaluator sees them: rank and suit counts packed into their keys, and a card mask.
+    # A card coming on the turn or the river is added in O(1) instead of going through all the cards again
+    __slots__ = ('rank_key', 'suit_key', 'mask', 'count')
+
+    def __init__(self, cards=()):
+        self.rank_key = 0
+        self.suit_key = 0
+        self.mask = 0
+        self.count = 0
+        for number in cards:
+            self.add(number)
+
+    def add(self, number):
+        self.rank_key += RANK_KEYS[number]
+        self.suit_key += SUIT_KEYS[number]
+        self.mask |= CARD_BITS[number]
+        self.count += 1
+
+    def add_mask(self, mask):
+        mask &= ~self.mask
+        while mask:
+            low = mask & -mask
+            self.add(low.bit_length() - 1)
+            mask ^= low
+
+    def rank_counts(self):
+        return [self.rank_key // RANK_KEY_OF_VALUE[value] % 5 for value in range(13)]
+
+    def suit_counts(self):
+        return [(self.suit_key >> 3 * suit) & 7 for suit in range(4)]
+
+    def value(self):
+        suit = FLUSH_SUIT[self.suit_key]
+        if suit < 0:
+            return RANK_TABLE[self.rank_key]
+        return FLUSH_TABLE[(self.mask >> 13 * suit) & RANK_MASK]
@@ -0,0 +1,129 @@
+# What happens at the table as compact records (hand, kind, seat, amount, cards mask) sent to a sink.
+# A sink has emit(hand, kind, seat, amount, cards), flush() and close(). The writers keep records in memory
+# and write them in big chunks, so logging millions of hands does not cost a system call per action
+import struct
+
+DEAL = 0       # cards: the hole cards
+BLIND = 1      # amount: the blind
+RAISE = 2      # amount: the stake after the action
+RERAISE = 3
+CALL = 4
+CHECK = 5
+FOLD = 6
+STREET = 7     # seat 0, cards: the board
+SHOWDOWN = 8   # amount: the hand value from the evaluator, cards: the hole cards
+WIN = 9        # amount: the hand value
+
+KIND_NAMES = ['deal', 'blind', 'raise', 'reraise', 'call', 'check', 'fold', 'street', 'showdown', 'win']
+# what the action methods of Game put into stake_list -> the kind of the record
+ACTION_KINDS = {'raise': RAISE, 'reraise': RERAISE, 'call': CALL, 'check': CHECK, 'fold': FOLD}
+
+RECORD = struct.Struct('<QBBqQ')  # 26 bytes: hand, kind, seat, amount, cards
+CHUNK_RECORDS = 1 << 16
+
+
+class NullSink:
+    def emit(self, hand, kind, seat, amount, cards):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    # with BinaryWriter(path) as sink: ... closes the sink and writes what it still holds
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+NULL_SINK = NullSink()
+
+
+class PrintSink(NullSink):
+    # the actions for people watching a game, the rest of the story is printed by Game.announce
+    def emit(self, hand, kind, seat, amount, cards):
+        if RAISE <= kind <= FOLD:
+            print('Next is:', seat, ', His stake:', amount, f'({KIND_NAMES[kind]})')
+
+
+class RingBuffer(NullSink):
+    # the last `capacity` records, the older ones are overwritten
+    def __init__(self, capacity=CHUNK_RECORDS):
+        self.capacity = capacity
+        self.buffer = [None] * capacity
+        self.position = 0
+        self.total = 0
+
+    def emit(self, hand, kind, seat, amount, cards):
+        self.buffer[self.position] = (hand, kind, seat, amount, cards)
+        self.position += 1
+        if self.position == self.capacity:
+            self.position = 0
+        self.total += 1
+
+    def records(self):
+        if self.total < self.capacity:
+            return self.buffer[:self.position]
+        return self.buffer[self.position:] + self.buffer[:self.position]
+
+
+class BinaryWriter(NullSink):
+    # appends RECORD structs to a file, one write per `chunk_records` records
+    def __init__(self, path, chunk_records=CHUNK_RECORDS):
+        self.file = open(path, 'ab', buffering=0)
+        self.chunk = bytearray(RECORD.size * chunk_records)
+        self.offset = 0
+
+    def emit(self, hand, kind, seat, amount, cards):
+        RECORD.pack_into(self.chunk, self.offset, hand, kind, seat, amount, cards)
+        self.offset += RECORD.size
+        if self.offset == len(self.chunk):
+            self.flush()
+
+    def flush(self):
+        if self.offset:
+            self.file.write(memoryview(self.chunk)[:self.offset])
+            self.offset = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_records(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    return RECORD.iter_unpack(data)
+
+
+class NdjsonWriter(NullSink):
+    # one JSON object per line, written `chunk_records` lines at a time
+    def __init__(self, path, chunk_records=CHUNK_RECORDS):
+        self.file = open(path, 'ab', buffering=0)
+        self.chunk_records = chunk_records
+        self.lines = []
+
+    def emit(self, hand, kind, seat, amount, cards):
+        self.lines.append(f'{{"hand":{hand},"kind":"{KIND_NAMES[kind]}","seat":{seat},'
+                          f'"amount":{amount},"cards":{cards}}}\n')
+        if len(self.lines) == self.chunk_records:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.file.write(''.join(self.lines).encode())
+            self.lines.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_ndjson(path):
+    import json  # json and the re it needs are a good part of the import time of a short run
+    with open(path) as file:
+        return [json.loads(line) for line in file]
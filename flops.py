@@ -0,0 +1,226 @@
+# Every flop is one of 1,755 flops up to a swap of suits. For each of them the index keeps its texture,
+# which straights and flushes it makes possible, and the outs of every pair of hole cards.
+# The index is a small file next to this module, read and unpacked the first time it is needed;
+# a lookup is O(1) and needs no NumPy.
+# File layout (little endian): the 16-byte header '<4sHHI4x' (magic, version, flops, size of the outs block),
+#   the flop -> canonical flop table, 22100 x uint16, by the combinatorial number of the flop
+#   the suit permutation that makes it canonical, 22100 x uint8
+#   FLOP_RECORD of every canonical flop
+#   the zlib compressed outs: 1326 x uint8 per canonical flop, by the hole cards in the canonical suits
+import os
+import struct
+import zlib
+from itertools import permutations
+from math import comb
+
+from evaluator import CATEGORY_SHIFT, STRAIGHTS, evaluate
+
+HEADER = struct.Struct('<4sHHI4x')
+MAGIC = b'FLOP'
+VERSION = 1
+CANONICAL_FLOPS = 1755
+ALL_FLOPS = comb(52, 3)
+COMBOS = comb(52, 2)
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flop_index.bin')
+
+# texture bits
+PAIRED = 1
+TRIPS = 2
+MONOTONE = 4
+TWO_TONE = 8
+RAINBOW = 16
+# cards, texture, connectedness, straights two hole cards make, straights one card short, flush suits
+FLOP_RECORD = struct.Struct('<3BBBHHB')
+
+SUIT_PERMUTATIONS = list(permutations(range(4)))
+PERMUTED_CARDS = [[suits[number // 13] * 13 + number % 13 for number in range(52)] for suits in SUIT_PERMUTATIONS]
+# two cards -> the number of the pair among the 1326 in the order of itertools.combinations
+COMBO_NUMBERS = [[0] * 52 for _ in range(52)]
+_number = 0
+for _first in range(52):
+    for _second in range(_first + 1, 52):
+        COMBO_NUMBERS[_first][_second] = COMBO_NUMBERS[_second][_first] = _number
+        _number += 1
+
+
+def flop_number(cards):
+    # the combinatorial number of three different cards, 0 to 22099
+    first, second, third = sorted(cards)
+    return first + comb(second, 2) + comb(third, 3)
+
+
+class FlopInfo:
+    __slots__ = ('cards', 'texture', 'connectedness', 'straights', 'straight_draws', 'flush_suits', 'flush_draws')
+
+    def __init__(self, cards, texture, connectedness, straights, straight_draws, flushes):
+        self.cards = cards  # in the canonical suits
+        self.texture = texture
+        self.connectedness = connectedness  # most flop ranks in any five ranks in a row, 1-3
+        self.straights = straights  # bit i: the i-th of STRAIGHTS can be made with two hole cards
+        self.straight_draws = straight_draws  # bit i: two hole cards leave the i-th straight one card short
+        self.flush_suits = flushes & 15  # bit suit: three cards of the suit, two suited hole cards make a flush
+        self.flush_draws = flushes >> 4  # bit suit: two cards of the suit
+
+    def paired(self):
+        return bool(self.texture & PAIRED)
+
+    def monotone(self):
+        return bool(self.texture & MONOTONE)
+
+    def __str__(self):
+        return f'Flop {self.cards}: texture {self.texture}, connectedness {self.connectedness}'
+
+    def __repr__(self):
+        return str(self)
+
+
+def describe(cards):
+    # the record of one flop given as card numbers
+    ranks = [number % 13 for number in cards]
+    suits = [number // 13 for number in cards]
+    texture = 0
+    if len(set(ranks)) == 2:
+        texture |= PAIRED
+    elif len(set(ranks)) == 1:
+        texture |= TRIPS
+    texture |= {1: MONOTONE, 2: TWO_TONE, 3: RAINBOW}[len(set(suits))]
+    rank_bits = 0
+    for rank in ranks:
+        rank_bits |= 1 << rank
+    connectedness = 0
+    straights = 0
+    straight_draws = 0
+    for idx, (top, bits) in enumerate(STRAIGHTS):
+        count = bin(rank_bits & bits).count('1')
+        connectedness = max(connectedness, count)
+        if count == 3:
+            straights |= 1 << idx
+        if count >= 2:
+            straight_draws |= 1 << idx
+    flushes = 0
+    for suit in range(4):
+        if suits.count(suit) == 3:
+            flushes |= 1 << suit
+        elif suits.count(suit) == 2:
+            flushes |= 16 << suit
+    return texture, connectedness, straights, straight_draws, flushes
+
+
+def build_index():
+    # the canonical flop of every flop, the records, and the outs: the turn cards that lift the category
+    # of the hand made by the flop and the hole cards
+    import numpy as np
+    from batch_evaluator import evaluate_batch
+    from equity import all_combinations
+
+    binomials = np.array([[comb(number, power) for number in range(52)] for power in (1, 2, 3)], dtype=np.int64)
+
+    def numbers_of(flops):
+        flops = np.sort(flops, axis=-1)
+        return binomials[0][flops[..., 0]] + binomials[1][flops[..., 1]] + binomials[2][flops[..., 2]]
+
+    flops = np.empty((ALL_FLOPS, 3), dtype=np.intp)
+    flops[numbers_of(all_combinations(52, 3).astype(np.intp))] = all_combinations(52, 3)
+    numbers = numbers_of(np.array(PERMUTED_CARDS, dtype=np.intp)[:, flops])
+    permutation = numbers.argmin(axis=0)
+    canonical_numbers, canonical = np.unique(numbers.min(axis=0), return_inverse=True)
+    if len(canonical_numbers) != CANONICAL_FLOPS:
+        raise AssertionError(f'{len(canonical_numbers)} canonical flops')
+
+    combos = all_combinations(52, 2).astype(np.intp)
+    records = []
+    outs = np.zeros((CANONICAL_FLOPS, COMBOS), dtype=np.uint8)
+    for index, number in enumerate(canonical_numbers.tolist()):
+        cards = flops[number].tolist()
+        records.append(FLOP_RECORD.pack(*cards, *describe(cards)))
+        used = sum(1 << card for card in cards)
+        hole = combos[[not (used >> first & 1 or used >> second & 1) for first, second in combos.tolist()]]
+        turns = np.array([card for card in range(52) if not used >> card & 1], dtype=np.intp)
+        before = np.empty((len(hole), 5), dtype=np.intp)
+        before[:, :3] = cards
+        before[:, 3:] = hole
+        before = evaluate_batch(before) >> CATEGORY_SHIFT
+        # every hole cards with every turn card that is not one of them
+        rows, columns = np.nonzero((turns[None, :] != hole[:, :1]) & (turns[None, :] != hole[:, 1:]))
+        hands = np.empty((len(rows), 6), dtype=np.intp)
+        hands[:, :3] = cards
+        hands[:, 3:5] = hole[rows]
+        hands[:, 5] = turns[columns]
+        improved = (evaluate_batch(hands) >> CATEGORY_SHIFT) > before[rows]
+        counts = np.bincount(rows, improved, len(hole)).astype(np.uint8)
+        outs[index, [COMBO_NUMBERS[first][second] for first, second in hole.tolist()]] = counts
+    return canonical.astype(np.uint16), permutation.astype(np.uint8), records, outs
+
+
+def write_index(canonical, permutation, records, outs, path=INDEX_PATH):
+    packed = zlib.compress(outs.tobytes(), 9)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, CANONICAL_FLOPS, len(packed)))
+        file.write(canonical.astype('<u2').tobytes())
+        file.write(permutation.tobytes())
+        file.write(b''.join(records))
+        file.write(packed)
+
+
+class FlopIndex:
+    def __init__(self, path=INDEX_PATH):
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, flops, packed = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or flops != CANONICAL_FLOPS:
+            raise ValueError(f'{path} is not a flop index')
+        offset = HEADER.size
+        self.canonical = memoryview(data)[offset:offset + 2 * ALL_FLOPS].cast('H')
+        offset += 2 * ALL_FLOPS
+        self.permutation = data[offset:offset + ALL_FLOPS]
+        offset += ALL_FLOPS
+        self.flops = [FlopInfo(fields[:3], *fields[3:])
+                      for fields in FLOP_RECORD.iter_unpack(data[offset:offset + FLOP_RECORD.size * flops])]
+        offset += FLOP_RECORD.size * flops
+        self.outs = zlib.decompress(data[offset:offset + packed])
+
+    def flop(self, cards):
+        # FlopInfo of a flop given as three card numbers
+        return self.flops[self.canonical[flop_number(cards)]]
+
+    def outs_of(self, cards, first, second):
+        # how many turn cards lift the category of the hand of the hole cards first and second on the flop
+        number = flop_number(cards)
+        suits = PERMUTED_CARDS[self.permutation[number]]
+        return self.outs[self.canonical[number] * COMBOS + COMBO_NUMBERS[suits[first]][suits[second]]]
+
+
+INDEX = None
+
+
+def flop_index():
+    # the index is read the first time it is needed, and built first if the file is not there yet
+    global INDEX
+    if INDEX is None:
+        if not os.path.exists(INDEX_PATH):
+            write_index(*build_index())
+        INDEX = FlopIndex()
+    return INDEX
+
+
+def check(samples=2000, seed=0):
+    # the index against evaluating every turn card, on random flops and hole cards
+    import random
+    rng = random.Random(seed)
+    index = flop_index()
+    for _ in range(samples):
+        cards = rng.sample(range(52), 5)
+        flop, (first, second) = cards[:3], cards[3:]
+        before = evaluate(cards) >> CATEGORY_SHIFT
+        outs = sum(1 for turn in range(52) if turn not in cards and evaluate(cards + [turn]) >> CATEGORY_SHIFT > before)
+        if index.outs_of(flop, first, second) != outs:
+            raise AssertionError(f'outs of {first}, {second} on {flop}')
+        if index.flop(flop).texture != describe(flop)[0]:
+            raise AssertionError(f'texture of {flop}')
+
+
+if __name__ == '__main__':
+    write_index(*build_index())
+    INDEX = None
+    check()
+    print(os.path.getsize(INDEX_PATH), 'bytes')
@@ -0,0 +1,220 @@
+# Hand histories in columnar files, one file per column, so hand number N is read from every column at
+# a known offset without parsing anything before it. The files are memory-mapped by the reader.
+#   seed.bin      uint64     the seed play_hand got, replaying it deals the same hand again
+#   deck.bin      52 x uint8 the deck after the dealer was drawn, the cards are drawn from its end
+#   players.bin   uint8      number of players
+#   hole.bin      20 x uint8 two hole cards per seat, 255 for an empty seat
+#   board.bin     5 x uint8  flop, turn and river, 255 for a card that was not dealt
+#   showdown.bin  uint16     bit seat - 1 for every player at the showdown
+#   winners.bin   uint16     bit seat - 1 for every winner
+#   actions.bin   ACTION     (street, seat, kind, stake) of every action, hand after hand
+#   actions.idx   uint64     where the actions of every hand end in actions.bin (in records)
+import mmap
+import os
+import struct
+from random import Random
+
+from events import DEAL, FOLD, RAISE, SHOWDOWN, STREET, WIN, NullSink
+from Texas_holdem import Deck, Game, Player, mask_numbers, play_hand, to_number
+
+MAX_SEATS = 10
+EMPTY = 255
+ACTION = struct.Struct('<BBBq')
+STREETS = ['preflop', 'flop', 'turn', 'river']
+FIXED_COLUMNS = {'seed.bin': 8, 'deck.bin': 52, 'players.bin': 1, 'hole.bin': 2 * MAX_SEATS, 'board.bin': 5,
+                 'showdown.bin': 2, 'winners.bin': 2, 'actions.idx': 8}
+CHUNK_HANDS = 4096
+
+
+class HandRecord:
+    def __init__(self, number, seed, deck, players, hole, board, showdown, winners, actions):
+        self.number = number
+        self.seed = seed
+        self.deck = deck
+        self.players = players
+        self.hole = hole  # seat -> [card, card]
+        self.board = board
+        self.showdown = showdown  # seats
+        self.winners = winners
+        self.actions = actions  # (street, seat, kind, stake)
+
+    def __str__(self):
+        return f'Hand {self.number}: {self.players} players, board {self.board}, winners {self.winners}'
+
+    def __repr__(self):
+        return str(self)
+
+
+def mask_seats(mask):
+    return [seat for seat in range(1, MAX_SEATS + 1) if mask >> seat - 1 & 1]
+
+
+class HistoryWriter(NullSink):
+    # an events sink that turns the events of a hand into a row of every column
+    def __init__(self, directory, chunk_hands=CHUNK_HANDS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_hands = chunk_hands
+        self.columns = {name: bytearray() for name in list(FIXED_COLUMNS) + ['actions.bin']}
+        self.pending = 0
+        index = os.path.join(directory, 'actions.idx')
+        self.hands = os.path.getsize(index) // 8 if os.path.exists(index) else 0
+        self.actions_end = 0
+        if self.hands:
+            with open(index, 'rb') as file:
+                file.seek(-8, os.SEEK_END)
+                self.actions_end = struct.unpack('<Q', file.read())[0]
+        self.start_hand()
+
+    def start_hand(self):
+        self.hole = bytearray([EMPTY] * 2 * MAX_SEATS)
+        self.board = bytearray([EMPTY] * 5)
+        self.street = 0
+        self.showdown = 0
+        self.winners = 0
+
+    def emit(self, hand, kind, seat, amount, cards):
+        if kind == DEAL:
+            self.hole[2 * seat - 2:2 * seat] = bytes(mask_numbers(cards))
+        elif kind == STREET:
+            self.street += 1
+            dealt = mask_numbers(cards)
+            # the board of a street holds the cards of the streets before it
+            for number in dealt:
+                if number not in self.board:
+                    self.board[self.board.index(EMPTY)] = number
+        elif RAISE <= kind <= FOLD:
+            self.columns['actions.bin'] += ACTION.pack(self.street, seat, kind, amount)
+            self.actions_end += 1
+        elif kind == SHOWDOWN:
+            self.showdown |= 1 << seat - 1
+        elif kind == WIN:
+            self.winners |= 1 << seat - 1
+
+    def end_hand(self, seed, game, number_of_players):
+        if not self.winners and game.winner is not None:  # everybody else folded before the flop
+            self.winners = 1 << game.winner.seat - 1
+        columns = self.columns
+        columns['seed.bin'] += struct.pack('<Q', seed)
+        columns['deck.bin'] += bytes(to_number(card) for card in game.deck_order)
+        columns['players.bin'].append(number_of_players)
+        columns['hole.bin'] += self.hole
+        columns['board.bin'] += self.board
+        columns['showdown.bin'] += struct.pack('<H', self.showdown)
+        columns['winners.bin'] += struct.pack('<H', self.winners)
+        columns['actions.idx'] += struct.pack('<Q', self.actions_end)
+        self.hands += 1
+        self.pending += 1
+        if self.pending == self.chunk_hands:
+            self.flush()
+        self.start_hand()
+
+    def flush(self):
+        for name, data in self.columns.items():
+            if data:
+                with open(os.path.join(self.directory, name), 'ab') as file:
+                    file.write(data)
+                data.clear()
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+
+
+def record_hands(directory, count, number_of_players=6, seed=0):
+    # plays and records `count` hands, every hand with a seed of its own
+    writer = HistoryWriter(directory)
+    seeds = Random(seed)
+    for _ in range(count):
+        hand_seed = seeds.getrandbits(64)
+        game, players = play_hand(number_of_players, rng=Random(hand_seed), events=writer, hand=writer.hands)
+        writer.end_hand(hand_seed, game, number_of_players)
+    writer.close()
+    return writer.hands
+
+
+class HistoryReader:
+    def __init__(self, directory):
+        self.directory = directory
+        self.maps = {}
+        for name in list(FIXED_COLUMNS) + ['actions.bin']:
+            path = os.path.join(directory, name)
+            # a column that was never written or has nothing in it is empty, mmap cannot map zero bytes
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                self.maps[name] = b''
+                continue
+            with open(path, 'rb') as file:
+                self.maps[name] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.hands = len(self.maps['seed.bin']) // 8
+
+    def __len__(self):
+        return self.hands
+
+    def column(self, name, number):
+        width = FIXED_COLUMNS[name]
+        return self.maps[name][number * width:(number + 1) * width]
+
+    def hand(self, number):
+        if not 0 <= number < self.hands:
+            raise IndexError(f'there is no hand {number}')
+        start = struct.unpack('<Q', self.column('actions.idx', number - 1))[0] if number else 0
+        end = struct.unpack('<Q', self.column('actions.idx', number))[0]
+        actions = list(ACTION.iter_unpack(self.maps['actions.bin'][start * ACTION.size:end * ACTION.size]))
+        players = self.column('players.bin', number)[0]
+        hole_bytes = self.column('hole.bin', number)
+        hole = {seat: list(hole_bytes[2 * seat - 2:2 * seat]) for seat in range(1, players + 1)}
+        return HandRecord(number, struct.unpack('<Q', self.column('seed.bin', number))[0],
+                          list(self.column('deck.bin', number)), players, hole,
+                          [number for number in self.column('board.bin', number) if number != EMPTY],
+                          mask_seats(struct.unpack('<H', self.column('showdown.bin', number))[0]),
+                          mask_seats(struct.unpack('<H', self.column('winners.bin', number))[0]), actions)
+
+    def replay(self, number):
+        # deals and plays the hand again from its seed, and checks that it is the hand that was recorded
+        record = self.hand(number)
+        game, players = play_hand(record.players, rng=Random(record.seed))
+        if [to_number(card) for card in game.deck_order] != record.deck:
+            raise ValueError(f'hand {number}: the deck differs from the recorded one')
+        winners = game.winners or [game.winner]
+        if sorted(player.seat for player in winners if player is not None) != record.winners:
+            raise ValueError(f'hand {number}: the winners differ from the recorded ones')
+        return game, players
+
+    def showdown_winners(self, number):
+        # the winners that Game.define_winner finds for the recorded hole cards and board
+        record = self.hand(number)
+        deck = Deck(compact=True, order=record.deck)
+        players = []
+        for seat in record.showdown:
+            player = Player(deck, seat)
+            player.cards = [record.hole[seat]]
+            players.append(player)
+        game = Game(verbose=False)
+        game.river = record.board
+        game.define_winner(players)
+        return sorted(player.seat for player in game.winners or [game.winner])
+
+    def verify(self):
+        # recomputes the winner of every hand with a showdown in NumPy batches, returns the hands that disagree
+        import numpy as np
+        from batch_evaluator import evaluate_batch
+
+        hole = np.frombuffer(self.maps['hole.bin'], dtype=np.uint8).reshape(-1, MAX_SEATS, 2)
+        board = np.frombuffer(self.maps['board.bin'], dtype=np.uint8).reshape(-1, 5)
+        showdown = np.frombuffer(self.maps['showdown.bin'], dtype=np.uint16).astype(np.int64)
+        winners = np.frombuffer(self.maps['winners.bin'], dtype=np.uint16).astype(np.int64)
+        bits = np.int64(1) << np.arange(MAX_SEATS)
+        wrong = []
+        for start in range(0, self.hands, 1 << 16):
+            rows = np.nonzero(showdown[start:start + (1 << 16)])[0] + start
+            at_showdown = (showdown[rows, None] & bits) != 0
+            cards = np.empty((len(rows), MAX_SEATS, 7), dtype=np.intp)
+            cards[:, :, :5] = board[rows, None, :]
+            # the empty seats and the folded players get the cards of the first player at the showdown
+            first = hole[rows, np.argmax(at_showdown, axis=1)]
+            cards[:, :, 5:] = np.where(at_showdown[:, :, None], hole[rows], first[:, None, :])
+            values = np.where(at_showdown, evaluate_batch(cards), -1)
+            best = values.max(axis=1)
+            found = ((values == best[:, None]) * bits).sum(axis=1)
+            wrong.extend(rows[found != winners[rows]].tolist())
+        return wrong
@@ -0,0 +1,113 @@
+# Opt-in timing of the Game phases. A Profiler replaces the phase methods of one Game instance with
+# timed versions, so a Game without a profiler runs exactly the code it always did.
+#   profiler = Profiler()
+#   game = Game(profiler=profiler)   or   play_hand(profiler=profiler)
+#   print(profiler.to_prometheus())
+import json
+import time
+from bisect import bisect_left
+
+# the phases of a hand, next_round_bidding is counted per street
+PHASES = ['define_dealer', 'define_small_blind', 'define_big_blind', 'first_round_bidding', 'next_round_bidding',
+          'equalize', 'check_del', 'define_winner']
+# the methods that evaluate cards: make_combination goes to the evaluator, evaluate_starting_hands to the preflop table
+EVALUATIONS = ['make_combination', 'evaluate_starting_hands']
+# upper bounds of the histogram buckets in seconds, the last bucket has no bound
+BUCKETS = [1e-06, 2.5e-06, 5e-06, 1e-05, 2.5e-05, 5e-05, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other):
+        for idx, count in enumerate(other.counts):
+            self.counts[idx] += count
+        self.count += other.count
+        self.total += other.total
+
+
+class Profiler:
+    def __init__(self):
+        self.phases = {}  # phase -> Histogram of its wall time
+        self.evaluations = {name: 0 for name in EVALUATIONS}
+
+    def attach(self, game):
+        for name in PHASES:
+            setattr(game, name, self.timed(name, getattr(game, name)))
+        for name in EVALUATIONS:
+            setattr(game, name, self.counted(name, getattr(game, name)))
+        return game
+
+    def histogram(self, phase):
+        if phase not in self.phases:
+            self.phases[phase] = Histogram()
+        return self.phases[phase]
+
+    def timed(self, name, method):
+        clock = time.perf_counter
+        if name == 'next_round_bidding':
+            def timed_street(nmb_of_players, lst_of_players, r, board):
+                start = clock()
+                result = method(nmb_of_players, lst_of_players, r, board)
+                self.histogram(f'{name}.{r}').record(clock() - start)
+                return result
+            return timed_street
+        histogram = self.histogram(name)
+
+        def timed(*args):
+            start = clock()
+            result = method(*args)
+            histogram.record(clock() - start)
+            return result
+        return timed
+
+    def counted(self, name, method):
+        evaluations = self.evaluations
+
+        def counted(*args):
+            evaluations[name] += 1
+            return method(*args)
+        return counted
+
+    def merge(self, other):
+        for phase, histogram in other.phases.items():
+            self.histogram(phase).merge(histogram)
+        for name, count in other.evaluations.items():
+            self.evaluations[name] = self.evaluations.get(name, 0) + count
+        return self
+
+    def to_dict(self):
+        return {
+            'phases': {phase: {'count': histogram.count, 'seconds': histogram.total,
+                               'buckets': dict(zip([str(bound) for bound in BUCKETS] + ['+Inf'], histogram.counts))}
+                       for phase, histogram in self.phases.items()},
+            'evaluations': dict(self.evaluations),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    def to_prometheus(self):
+        lines = ['# HELP holdem_phase_seconds Wall time of the Game phases.',
+                 '# TYPE holdem_phase_seconds histogram']
+        for phase, histogram in sorted(self.phases.items()):
+            cumulative = 0
+            for bound, count in zip([repr(bound) for bound in BUCKETS] + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f'holdem_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+            lines.append(f'holdem_phase_seconds_sum{{phase="{phase}"}} {histogram.total!r}')
+            lines.append(f'holdem_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+        lines.append('# HELP holdem_evaluations_total Calls of the methods that evaluate cards.')
+        lines.append('# TYPE holdem_evaluations_total counter')
+        for name, count in sorted(self.evaluations.items()):
+            lines.append(f'holdem_evaluations_total{{method="{name}"}} {count}')
+        return '\n'.join(lines) + '\n'
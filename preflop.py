@@ -0,0 +1,128 @@
+# Preflop equity of all 169 starting hands against 1-9 random opponents.
+# The table is a small binary file next to this module, memory-mapped at import, so a lookup is O(1).
+# File layout (little endian): the 16-byte header '<4sHHH6x' (magic, version, hands, opponents),
+# then the equity of every hand against every number of opponents as uint16 (65535 = 1.0),
+# then the place of the hand among all 169 for that number of opponents as uint8 (0 = the best)
+import mmap
+import os
+import struct
+
+CARD_LETTERS = '23456789TJQKA'
+HEADER = struct.Struct('<4sHHH6x')
+MAGIC = b'PFEQ'
+VERSION = 1
+HANDS = 169
+MAX_OPPONENTS = 9
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.bin')
+
+
+def class_index(high, low, suited):
+    # the usual 13x13 chart: pairs on the diagonal, suited hands above it, offsuit ones below, AA first
+    if suited:
+        return (12 - high) * 13 + (12 - low)
+    return (12 - low) * 13 + (12 - high)
+
+
+def hand_class(first, second):
+    # the class of two hole cards given as card numbers
+    high, low = max(first % 13, second % 13), min(first % 13, second % 13)
+    return class_index(high, low, first // 13 == second // 13 and high != low)
+
+
+STARTING_HANDS = [''] * HANDS
+for _high in range(13):
+    for _low in range(_high + 1):
+        if _high == _low:
+            STARTING_HANDS[class_index(_high, _low, False)] = CARD_LETTERS[_high] * 2
+        else:
+            STARTING_HANDS[class_index(_high, _low, True)] = CARD_LETTERS[_high] + CARD_LETTERS[_low] + 's'
+            STARTING_HANDS[class_index(_high, _low, False)] = CARD_LETTERS[_high] + CARD_LETTERS[_low] + 'o'
+
+
+def class_cards(index):
+    # two card numbers of the class: hearts, or a heart and a diamond when the hand is not suited
+    name = STARTING_HANDS[index]
+    high, low = CARD_LETTERS.index(name[0]), CARD_LETTERS.index(name[1])
+    if name.endswith('s'):
+        return high, low
+    return high, 13 + low
+
+
+def sample_equity(first, second, opponents, samples, rng, chunk=20000):
+    # the average share of the pot for the two cards against `opponents` random hands
+    import numpy as np
+    from batch_evaluator import evaluate_batch
+    from equity import showdown_stats
+
+    remaining = np.array([number for number in range(52) if number not in (first, second)], dtype=np.int8)
+    share = 0.0
+    done = 0
+    while done < samples:
+        size = min(chunk, samples - done)
+        dealt = rng.permuted(np.broadcast_to(remaining, (size, remaining.size)), axis=1)[:, :5 + 2 * opponents]
+        cards = np.empty((opponents + 1, size, 7), dtype=np.intp)
+        cards[:, :, :5] = dealt[:, :5]
+        cards[0, :, 5] = first
+        cards[0, :, 6] = second
+        for idx in range(opponents):
+            cards[idx + 1, :, 5:] = dealt[:, 5 + 2 * idx:7 + 2 * idx]
+        values = evaluate_batch(cards)
+        share += showdown_stats(values)[2][0]
+        done += size
+    return share / samples
+
+
+def build_table(samples=50000, seed=0):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    equities = [[0.0] * MAX_OPPONENTS for _ in range(HANDS)]
+    for index in range(HANDS):
+        first, second = class_cards(index)
+        for opponents in range(1, MAX_OPPONENTS + 1):
+            equities[index][opponents - 1] = sample_equity(first, second, opponents, samples, rng)
+    return equities
+
+
+def write_table(equities, path=TABLE_PATH):
+    places = [[0] * MAX_OPPONENTS for _ in range(HANDS)]
+    for column in range(MAX_OPPONENTS):
+        order = sorted(range(HANDS), key=lambda index: -equities[index][column])
+        for place, index in enumerate(order):
+            places[index][column] = place
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, HANDS, MAX_OPPONENTS))
+        file.write(struct.pack(f'<{HANDS * MAX_OPPONENTS}H',
+                               *(round(equity * 65535) for row in equities for equity in row)))
+        file.write(bytes(place for row in places for place in row))
+
+
+def load_table(path=TABLE_PATH):
+    with open(path, 'rb') as file:
+        table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, hands, opponents = HEADER.unpack_from(table)
+    if magic != MAGIC or version != VERSION or hands != HANDS or opponents != MAX_OPPONENTS:
+        raise ValueError(f'{path} is not a preflop equity table')
+    size = HANDS * MAX_OPPONENTS
+    view = memoryview(table)
+    return view[HEADER.size:HEADER.size + 2 * size].cast('H'), view[HEADER.size + 2 * size:HEADER.size + 3 * size]
+
+
+EQUITIES = PLACES = None
+if os.path.exists(TABLE_PATH):  # it is missing only while it is being built for the first time
+    EQUITIES, PLACES = load_table()
+
+
+def preflop_equity(first, second, opponents):
+    return EQUITIES[hand_class(first, second) * MAX_OPPONENTS + opponents - 1] / 65535
+
+
+def preflop_place(first, second, opponents):
+    return PLACES[hand_class(first, second) * MAX_OPPONENTS + opponents - 1]
+
+
+if __name__ == '__main__':
+    write_table(build_table())
+    EQUITIES, PLACES = load_table()
+    for opponents in (1, 9):
+        best = sorted(range(HANDS), key=lambda index: PLACES[index * MAX_OPPONENTS + opponents - 1])
+        print(opponents, [STARTING_HANDS[index] for index in best[:10]], [STARTING_HANDS[index] for index in best[-5:]])
@@ -0,0 +1,216 @@
+# Hand ranges: a weight for each of the 1326 two-card combos, parsed from the usual notation
+#   "QQ+, AKs, T9s, A5s-A2s, KQo:0.5, AhKh"
+# and range-vs-range equity on a flop, turn or river: all the combos of both ranges are evaluated on all
+# the runouts as (runouts, combos) matrices in NumPy batches, and weighed against each other with sorted sums
+import numpy as np
+
+from batch_evaluator import (CARD_RANK_BITS, CARD_RANK_KEYS, CARD_SUIT_KEYS, CARD_SUITS, FLUSH_SUITS, FLUSH_VALUES,
+                             RANK_VALUES, SORTED_RANK_KEYS)
+from equity import CARD_BITS, Equity, all_combinations
+from preflop import CARD_LETTERS, class_index, hand_class
+from Texas_holdem import card_mask, card_numbers
+
+SUIT_LETTERS = 'hdcs'  # the suits of Card: hearts, diamonds, clubs, spades
+COMBOS = all_combinations(52, 2).astype(np.intp)  # (1326, 2) card numbers, the lower card first
+COMBO_MASKS = CARD_BITS[COMBOS[:, 0]] | CARD_BITS[COMBOS[:, 1]]
+COMBO_CLASSES = np.array([hand_class(first, second) for first, second in COMBOS.tolist()], dtype=np.intp)
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.intp)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(len(COMBOS))
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(len(COMBOS))
+# what a combo adds to the keys of a board, and its rank bits in every suit
+COMBO_RANK_KEYS = CARD_RANK_KEYS[COMBOS].sum(axis=1)
+COMBO_SUIT_KEYS = CARD_SUIT_KEYS[COMBOS].sum(axis=1)
+
+
+def suit_bits(cards):
+    # (..., cards) card numbers -> (..., 4) the rank bits of the cards of every suit
+    return ((CARD_SUITS[cards][..., None] == np.arange(4)) * CARD_RANK_BITS[cards][..., None]).sum(axis=-2)
+
+
+COMBO_SUIT_BITS = suit_bits(COMBOS)
+MATRIX_CHUNK = 1 << 20  # (hero + villain combos) x runouts per batch
+VALUE_LIMIT = 1 << 25  # above every hand value + 1
+
+
+def _card(text):
+    if len(text) != 2 or text[0] not in CARD_LETTERS or text[1] not in SUIT_LETTERS:
+        raise ValueError(f'Not a card: {text}')
+    return SUIT_LETTERS.index(text[1]) * 13 + CARD_LETTERS.index(text[0])
+
+
+def _classes(text):
+    # 'QQ', 'AKs', 'AKo' or 'AK' -> the starting hand classes
+    if len(text) not in (2, 3) or text[0] not in CARD_LETTERS or text[1] not in CARD_LETTERS:
+        raise ValueError(f'Not a starting hand: {text}')
+    high, low = CARD_LETTERS.index(text[0]), CARD_LETTERS.index(text[1])
+    if high < low:
+        high, low = low, high
+    if high == low:
+        if len(text) == 3:
+            raise ValueError(f'A pair is neither suited nor offsuit: {text}')
+        return [class_index(high, low, False)]
+    if len(text) == 2:
+        return [class_index(high, low, True), class_index(high, low, False)]
+    if text[2] not in 'so':
+        raise ValueError(f'Not a starting hand: {text}')
+    return [class_index(high, low, text[2] == 's')]
+
+
+def _hands(text):
+    # the starting hands of one part of a range, with + and - expanded
+    if text.endswith('+'):
+        text = text[:-1]
+        _classes(text)
+        high, low = sorted((CARD_LETTERS.index(text[0]), CARD_LETTERS.index(text[1])), reverse=True)
+        if high == low:
+            return [CARD_LETTERS[rank] * 2 for rank in range(low, 13)]
+        return [CARD_LETTERS[high] + CARD_LETTERS[rank] + text[2:] for rank in range(low, high)]
+    if '-' in text:
+        first, last = text.split('-')
+        _classes(first)
+        _classes(last)
+        if first[0] == first[1] and last[0] == last[1]:
+            ranks = sorted((CARD_LETTERS.index(first[0]), CARD_LETTERS.index(last[0])))
+            return [CARD_LETTERS[rank] * 2 for rank in range(ranks[0], ranks[1] + 1)]
+        if first[0] != last[0] or first[2:] != last[2:]:
+            raise ValueError(f'A range of hands keeps the high card and the suits: {text}')
+        ranks = sorted((CARD_LETTERS.index(first[1]), CARD_LETTERS.index(last[1])))
+        return [first[0] + CARD_LETTERS[rank] + first[2:] for rank in range(ranks[0], ranks[1] + 1)]
+    return [text]
+
+
+def parse_range(text):
+    # comma separated hands, each may end with :weight (1 by default), a later hand overrides an earlier one
+    weights = np.zeros(len(COMBOS))
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        weight = 1.0
+        if ':' in part:
+            part, weight = part.split(':')
+            weight = float(weight)
+        if len(part) == 4 and part[1] in SUIT_LETTERS:
+            first, second = _card(part[:2]), _card(part[2:])
+            if first == second:
+                raise ValueError(f'A card is dealt twice: {part}')
+            weights[COMBO_INDEX[first, second]] = weight
+            continue
+        for hand in _hands(part):
+            for index in _classes(hand):
+                weights[COMBO_CLASSES == index] = weight
+    return weights
+
+
+def combo_weights(hands):
+    # a range of exactly these hole cards (Card lists, number lists or masks)
+    weights = np.zeros(len(COMBOS))
+    for hand in hands:
+        first, second = card_numbers(hand)
+        weights[COMBO_INDEX[first, second]] = 1.0
+    return weights
+
+
+def without_cards(weights, cards):
+    # the range without the combos that hold one of the known cards
+    return np.where(COMBO_MASKS & np.uint64(card_mask(cards)), 0.0, weights)
+
+
+def combo_values(combos, board_cards, board_masks):
+    # hand values of every combo on every board: board_cards (boards, 5) -> (boards, combos),
+    # -1 where the combo holds a card of the board. The keys of a hand are the board's plus the combo's and a
+    # flush is the union of their rank bits in the suit, so no 7-card rows are built; the hands that hold
+    # a card twice get some value and are blocked afterwards
+    rank_keys = CARD_RANK_KEYS[board_cards].sum(axis=1)[:, None] + COMBO_RANK_KEYS[combos]
+    found = np.minimum(np.searchsorted(SORTED_RANK_KEYS, rank_keys), len(SORTED_RANK_KEYS) - 1)
+    values = RANK_VALUES[found]
+    flush_suits = FLUSH_SUITS[CARD_SUIT_KEYS[board_cards].sum(axis=1)[:, None] + COMBO_SUIT_KEYS[combos]]
+    boards, columns = np.nonzero(flush_suits >= 0)
+    if boards.size:
+        suits = flush_suits[boards, columns]
+        bits = suit_bits(board_cards)[boards, suits] | COMBO_SUIT_BITS[combos[columns], suits]
+        values[boards, columns] = FLUSH_VALUES[bits]
+    values[(COMBO_MASKS[combos] & board_masks[:, None]) != 0] = -1
+    return values
+
+
+def _below(keys, weights, order):
+    # the weight of the keys below (and up to) every key within its group, keys // VALUE_LIMIT, in the order of
+    # the keys. `order` sorts the keys within every group; equal keys are runs in it, so nothing is searched
+    ordered = keys[order]
+    cumulative = np.concatenate(([0.0], np.cumsum(weights[order])))
+    runs = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1], [True])))
+    lengths = np.diff(runs)
+    groups = ordered[runs[:-1]] // VALUE_LIMIT
+    start = np.maximum.accumulate(np.where(np.concatenate(([True], groups[1:] != groups[:-1])), runs[:-1], 0))
+    below = np.empty(len(keys))
+    up_to = np.empty(len(keys))
+    below[order] = np.repeat(cumulative[runs[:-1]] - cumulative[start], lengths)
+    up_to[order] = np.repeat(cumulative[runs[1:]] - cumulative[start], lengths)
+    return below, up_to
+
+
+def range_equity(hero, villain, board, dead_cards=()):
+    # exact equity of the hero range against the villain range on a board of 3-5 cards.
+    # Every pair of combos that do not share a card weighs hero weight x villain weight, and for every such pair
+    # each runout that misses all their cards is equally likely.
+    # Both ranges are evaluated on all the runouts as (runouts, combos) matrices. Against a hero combo the villain
+    # weight below (and up to) its value is read from the villain values sorted per runout, and the combos that
+    # share a card with it are taken out the same way from the villain values sorted per runout and card
+    board = card_numbers(board)
+    if not 3 <= len(board) <= 5:
+        raise ValueError('Range equity needs a flop, a turn or a river')
+    known = card_mask(board) | card_mask(dead_cards)
+    hero = without_cards(hero, known)
+    villain = without_cards(villain, known)
+    if not hero.any() or not villain.any():
+        raise ValueError('A range has no combos left')
+    # both ranges are evaluated together on the combos of either, with a weight of 0 outside a range
+    combos = np.flatnonzero((hero > 0) | (villain > 0))
+
+    remaining = np.array([number for number in range(52) if not known >> number & 1], dtype=np.intp)
+    runouts = remaining[all_combinations(remaining.size, 5 - len(board)).astype(np.intp)]
+    board_cards = np.empty((len(runouts), 5), dtype=np.intp)
+    board_cards[:, :len(board)] = board
+    board_cards[:, len(board):] = runouts
+    runout_masks = CARD_BITS[runouts].sum(axis=1)
+    # the villain weight of the hero combo itself, it shares both cards and is taken out twice
+    same = villain[combos]
+    combo_cards = COMBOS[combos]
+
+    wins = ties = total = 0.0
+    chunk = max(1, MATRIX_CHUNK // combos.size)
+    for start in range(0, len(board_cards), chunk):
+        boards = board_cards[start:start + chunk]
+        # values shifted by one, so a combo the runout blocks is 0 and the others are above it
+        values = combo_values(combos, boards, runout_masks[start:start + chunk]) + 1
+        hero_weights = np.where(values, hero[combos], 0.0)
+        villain_weights = np.where(values, villain[combos], 0.0).ravel()
+        rows = np.arange(len(boards), dtype=np.int64)[:, None]
+
+        # all villain combos of a runout
+        keys = (rows * VALUE_LIMIT + values).ravel()
+        order = np.argsort(keys)
+        below, up_to = _below(keys, villain_weights, order)
+        below = below.reshape(values.shape)
+        up_to = up_to.reshape(values.shape) + same
+        apart = villain_weights.reshape(values.shape).sum(axis=1)[:, None] + same
+        # the villain combos holding one card, for both cards of every combo: the runout order split up by
+        # card with a stable sort keeps every (card, runout) group sorted by value
+        cards = rows[:, :, None] * 52 + combo_cards
+        card_keys = (cards * VALUE_LIMIT + values[:, :, None]).ravel()
+        card_order = (order[:, None] * 2 + np.arange(2)).ravel()
+        card_ids = np.tile(combo_cards.ravel().astype(np.uint8), len(boards))
+        card_order = card_order[np.argsort(card_ids[card_order], kind='stable')]
+        card_below, card_up_to = _below(card_keys, np.repeat(villain_weights, 2), card_order)
+        below -= (card_below[::2] + card_below[1::2]).reshape(values.shape)
+        up_to -= (card_up_to[::2] + card_up_to[1::2]).reshape(values.shape)
+        card_weights = np.bincount(cards.ravel(), np.repeat(villain_weights, 2), len(boards) * 52)
+        apart -= card_weights[cards[:, :, 0]] + card_weights[cards[:, :, 1]]
+        wins += (hero_weights * below).sum()
+        ties += (hero_weights * (up_to - below)).sum()
+        total += (hero_weights * apart).sum()
+    if not total:
+        raise ValueError('The ranges always share a card')
+    shares = wins + ties / 2
+    return Equity(wins, ties, shares, shares, total, exact=True)
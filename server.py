@@ -0,0 +1,230 @@
+# Many tables in one process: every table is an asyncio task playing hand after hand, and every action
+# of a player is a decision the table awaits with a timeout. When the decision does not come in time
+# (or is not a legal one) the player's own Strategy decides.
+# The players sit at the other end of a TCP connection speaking newline-delimited JSON:
+#   client -> server  {"open": tables, "players": players per table, "hands": hands per table, "seed": seed,
+#                      "stack": chips of every seat}
+#   server -> client  {"id": id, "table": table, "seat": seat, "street": street, "stake": biggest stake,
+#                      "cards": mask of the hole cards, "board": mask of the board, "legal": [actions]}
+#   client -> server  {"id": id, "action": one of the legal actions or "auto"}
+#   server -> client  {"done": hands, "seconds": seconds, "p50": seconds, "p99": seconds}
+#   python server.py                          play 10, 100 and 1000 tables against the load generator
+#   python server.py serve --port 8765        just serve
+#   python server.py load --port 8765 --tables 100
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from events import NULL_SINK
+from Texas_holdem import card_mask, hand_steps, start_hand
+
+DECISION_TIMEOUT = 1.0  # seconds
+STACK = 1000  # chips of every seat at the start of a hand
+
+
+def apply_action(game, action):
+    # a decision of the player as a decide function for Game.act
+    def decide(pl, *args):
+        if action in ('raise', 'reraise'):
+            return game.make_raise()
+        if action == 'call':
+            return game.call()
+        if action == 'fold':
+            return game.fold(pl)
+        return game.check()
+    return decide
+
+
+async def bid(game, player, street, board, decide, timeout, latencies):
+    # the decision of the player, or None for his own Strategy
+    legal = game.betting.legal()
+    start = time.perf_counter()
+    try:
+        action = await asyncio.wait_for(decide(game, player, street, board, legal), timeout)
+    except asyncio.TimeoutError:
+        action = 'auto'
+    latencies.append(time.perf_counter() - start)
+    if action not in legal:
+        return None
+    return apply_action(game, action)
+
+
+async def play_table_hand(number_of_players, decide, rng=None, events=None, hand=0, timeout=DECISION_TIMEOUT,
+                          latencies=None, stacks=None):
+    # play_hand with awaited decisions: the same hand, only the bids wait for the players
+    if latencies is None:
+        latencies = []
+    game, players, deck = start_hand(number_of_players, False, rng, None, events or NULL_SINK, hand, stacks)
+    steps = hand_steps(game, players, deck, lambda street, board: game.bidding(players, street, board))
+    decision = None
+    while True:
+        try:
+            player, street, board = steps.send(decision)
+        except StopIteration:
+            return game, players
+        decision = await bid(game, player, street, board, decide, timeout, latencies)
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(share * len(values)), len(values) - 1)]
+
+
+class TableManager:
+    def __init__(self, timeout=DECISION_TIMEOUT, events=None):
+        self.timeout = timeout
+        self.events = events
+        self.tables = []
+        self.hands = 0
+        self.latencies = []  # seconds from asking a player to applying his decision
+
+    def open_table(self, number_of_players, hands, decide, seed=0, stack=STACK):
+        table = len(self.tables)
+        task = asyncio.create_task(self.run_table(table, number_of_players, hands, decide, seed, stack))
+        self.tables.append(task)
+        return task
+
+    async def run_table(self, table, number_of_players, hands, decide, seed, stack):
+        rng = random.Random(f'{seed}:{table}')
+        for _ in range(hands):
+            hand = self.hands
+            self.hands += 1
+            await play_table_hand(number_of_players, lambda *args: decide(table, *args), rng, self.events, hand,
+                                  self.timeout, self.latencies, [stack] * number_of_players)
+
+    async def wait(self):
+        await asyncio.gather(*self.tables)
+
+    def close(self):
+        # the tables still playing stop, e.g. when their client is gone
+        for task in self.tables:
+            task.cancel()
+
+    def stats(self, seconds):
+        return {'done': self.hands, 'seconds': seconds, 'p50': percentile(self.latencies, 0.5),
+                'p99': percentile(self.latencies, 0.99)}
+
+
+class Connection:
+    # the players of one client, every decision is a request with an id and a future for the reply
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.next_id = 0
+
+    async def decide(self, table, game, player, street, board, legal):
+        request = self.next_id
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request] = future
+        self.writer.write(json.dumps({'id': request, 'table': table, 'seat': player.seat, 'street': street,
+                                      'stake': game.biggest_stake, 'cards': card_mask(player.cards[0]),
+                                      'board': card_mask(board), 'legal': legal}).encode() + b'\n')
+        try:
+            await self.writer.drain()
+            return await future
+        finally:
+            self.pending.pop(request, None)
+
+    async def read_replies(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            reply = json.loads(line)
+            future = self.pending.get(reply.get('id'))
+            if future is not None and not future.done():  # a late reply is dropped
+                future.set_result(reply.get('action'))
+        for future in self.pending.values():
+            if not future.done():
+                future.set_result('auto')
+
+
+async def handle_client(reader, writer, timeout=DECISION_TIMEOUT):
+    connection = Connection(reader, writer)
+    manager = TableManager(timeout)
+    replies = None
+    try:
+        request = json.loads(await reader.readline())
+        replies = asyncio.create_task(connection.read_replies())
+        start = time.perf_counter()
+        for _ in range(request['open']):
+            manager.open_table(request.get('players', 6), request.get('hands', 1), connection.decide,
+                               request.get('seed', 0), request.get('stack', STACK))
+        await manager.wait()
+        writer.write(json.dumps(manager.stats(time.perf_counter() - start)).encode() + b'\n')
+        await writer.drain()
+    except (ConnectionError, json.JSONDecodeError, KeyError):
+        pass
+    finally:
+        # whatever ended the client, nothing of it keeps running
+        manager.close()
+        if replies is not None:
+            replies.cancel()
+        writer.close()
+
+
+async def serve(host='127.0.0.1', port=0, timeout=DECISION_TIMEOUT):
+    return await asyncio.start_server(lambda reader, writer: handle_client(reader, writer, timeout), host, port)
+
+
+async def load(host, port, tables, players=6, hands=10, seed=0, auto_share=0.0, stack=STACK):
+    # a load generator: a random legal action for every request, or 'auto' with the probability auto_share
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    request = {'open': tables, 'players': players, 'hands': hands, 'seed': seed, 'stack': stack}
+    writer.write(json.dumps(request).encode() + b'\n')
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError('the server closed the connection')
+        message = json.loads(line)
+        if 'done' in message:
+            break
+        action = 'auto' if rng.random() < auto_share else rng.choice(message['legal'])
+        writer.write(json.dumps({'id': message['id'], 'action': action}).encode() + b'\n')
+    writer.close()
+    await writer.wait_closed()
+    return message
+
+
+async def benchmark(table_counts, players, total_hands, timeout):
+    server = await serve(timeout=timeout)
+    port = server.sockets[0].getsockname()[1]
+    for tables in table_counts:
+        hands = max(1, total_hands // tables)
+        result = await load('127.0.0.1', port, tables, players, hands)
+        print(f'{tables:6} tables {result["done"] / result["seconds"]:10,.0f} hands/s   '
+              f'p50 {result["p50"] * 1000:8.2f} ms   p99 {result["p99"] * 1000:8.2f} ms')
+    server.close()
+    await server.wait_closed()
+
+
+async def serve_forever(host, port, timeout):
+    server = await serve(host, port, timeout)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('mode', nargs='?', choices=['benchmark', 'serve', 'load'], default='benchmark')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tables', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--players', type=int, default=6)
+    parser.add_argument('--hands', type=int, default=5000, help='hands in all, or per table for load')
+    parser.add_argument('--timeout', type=float, default=DECISION_TIMEOUT)
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        asyncio.run(serve_forever(args.host, args.port, args.timeout))
+    elif args.mode == 'load':
+        print(asyncio.run(load(args.host, args.port, args.tables[0], args.players, args.hands)))
+    else:
+        asyncio.run(benchmark(args.tables, args.players, args.hands, args.timeout))
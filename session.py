@@ -0,0 +1,92 @@
+# Many hands in a row at one table, like a tournament: the stacks go from hand to hand, the button moves
+# one live seat to the left every hand, a player without chips is out, and the blinds go up every
+# `hands_per_level` hands. Every hand is a Game played like play_hand, on one Deck, one Chips and the same
+# Player objects for the whole session; the deck is filled and shuffled in place for every hand.
+#   session = Session(6, stack=1000, rng=1)
+#   session.play(10000)
+#   python session.py [PLAYERS] [HANDS]
+from betting import next_seat
+from chips import Chips
+from events import NULL_SINK
+from Texas_holdem import CARDS, DEFAULT_STRATEGY, Deck, Game, Player, hand_steps
+
+# (small blind, big blind) of every level, the last one stays
+BLIND_LEVELS = [(1, 2), (2, 4), (3, 6), (5, 10), (10, 20), (15, 30), (25, 50), (50, 100), (75, 150), (100, 200),
+                (150, 300), (250, 500), (500, 1000)]
+HANDS_PER_LEVEL = 100
+STACK = 1000
+
+
+class Session:
+    def __init__(self, number_of_players=6, stack=STACK, levels=BLIND_LEVELS, hands_per_level=HANDS_PER_LEVEL,
+                 strategies=None, rng=None, events=NULL_SINK, profiler=None):
+        # strategies: a Strategy for every seat, the Game's own by default;
+        # profiler: an instrumentation.Profiler timing the phases of every hand
+        self.deck = Deck(rng=rng)
+        strategies = strategies or [DEFAULT_STRATEGY] * number_of_players
+        self.players = [Player(self.deck, seat, strategy=strategies[seat - 1])
+                        for seat in range(1, number_of_players + 1)]
+        self.chips = Chips([stack] * number_of_players)
+        self.levels = levels
+        self.hands_per_level = hands_per_level
+        self.events = events
+        self.profiler = profiler
+        self.hand = 0
+        self.eliminated = []  # the seats in the order they went out
+        # the first button is the highest card the players have drawn
+        game = Game(False)
+        game.define_dealer(self.players)
+        self.button = game.dealer.seat
+        self.alive = (1 << number_of_players) - 1
+
+    def blinds(self):
+        return self.levels[min(self.hand // self.hands_per_level, len(self.levels) - 1)]
+
+    def play_hand(self):
+        # one hand, then the players who lost their chips go and the button moves on; returns the Game
+        self.deck.cards[:] = CARDS
+        self.deck.shuffle()
+        self.chips.new_hand()
+        game = Game(False, self.profiler, self.events, self.hand, self.chips, self.blinds())
+        players = [player for player in self.players if self.alive >> player.seat - 1 & 1]
+        game.dealer = self.players[self.button - 1]
+        for _ in hand_steps(game, players, self.deck):
+            pass
+        self.hand += 1
+        for seat in game.betting.seats(self.alive):
+            if self.chips.stacks[seat - 1] == 0:
+                self.alive &= ~(1 << seat - 1)
+                self.eliminated.append(seat)
+        self.button = next_seat(self.alive, self.button)
+        return game
+
+    def over(self):
+        return self.alive.bit_count() < 2
+
+    def play(self, hands):
+        # up to `hands` hands, fewer when one player has all the chips; returns the hands played
+        start = self.hand
+        while self.hand - start < hands and not self.over():
+            self.play_hand()
+        return self.hand - start
+
+    def standings(self):
+        # the seats from the first place down: the ones still in by their stacks, then the last out first
+        alive = sorted((seat for seat in range(1, len(self.players) + 1) if self.alive >> seat - 1 & 1),
+                       key=lambda seat: -self.chips.stacks[seat - 1])
+        return alive + self.eliminated[::-1]
+
+    def __str__(self):
+        return f'Session hand {self.hand}, blinds {self.blinds()}, stacks {self.chips.stacks}'
+
+    def __repr__(self):
+        return str(self)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    session = Session(int(sys.argv[1]) if len(sys.argv) > 1 else 6, rng=0)
+    start = time.perf_counter()
+    played = session.play(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+    print(f'{played} hands, {played / (time.perf_counter() - start):.0f} hands/s, standings {session.standings()}')
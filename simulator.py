@@ -0,0 +1,102 @@
+# Millions of hands: they are cut into shards, the shards are played in worker processes
+# and their counts are merged into one result
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Texas_holdem import play_hand
+
+SHARD_SIZE = 20000
+
+
+class SimulationResult:
+    def __init__(self, number_of_players):
+        self.number_of_players = number_of_players
+        self.hands = 0
+        self.wins = [0.0] * number_of_players  # by seat, a tie gives every winner an equal share
+        self.pot_total = 0
+        self.biggest_pot = 0
+        self.actions = {}
+
+    def add_hand(self, game):
+        self.hands += 1
+        winners = game.winners
+        if not winners and game.winner is not None:
+            winners = [game.winner]
+        for player in winners:
+            self.wins[player.seat - 1] += 1 / len(winners)
+        self.pot_total += game.pot
+        if game.pot > self.biggest_pot:
+            self.biggest_pot = game.pot
+        for action, count in game.actions.items():
+            self.actions[action] = self.actions.get(action, 0) + count
+
+    def merge(self, other):
+        self.hands += other.hands
+        for idx, wins in enumerate(other.wins):
+            self.wins[idx] += wins
+        self.pot_total += other.pot_total
+        self.biggest_pot = max(self.biggest_pot, other.biggest_pot)
+        for action, count in other.actions.items():
+            self.actions[action] = self.actions.get(action, 0) + count
+        return self
+
+    def win_rate(self, seat):
+        return self.wins[seat - 1] / self.hands
+
+    def average_pot(self):
+        return self.pot_total / self.hands
+
+    def action_frequencies(self):
+        total = sum(self.actions.values())
+        return {action: count / total for action, count in self.actions.items()}
+
+    def __str__(self):
+        rates = ', '.join(f'{seat}: {self.win_rate(seat):.4f}' for seat in range(1, self.number_of_players + 1))
+        return f'Simulation {self.hands} hands, win rates {{{rates}}}, average pot {self.average_pot():.1f}'
+
+    def __repr__(self):
+        return str(self)
+
+
+def play_shard(number_of_players, hands, seed):
+    # every shard has a generator of its own, so a worker does not depend on what other workers did
+    rng = random.Random(seed)
+    result = SimulationResult(number_of_players)
+    for _ in range(hands):
+        game, players = play_hand(number_of_players, rng=rng)
+        result.add_hand(game)
+    return result
+
+
+def shard_seeds(seed, count):
+    # the seeds depend only on the simulation seed and the shard, not on the number of workers
+    return [random.Random(f'{seed}:{idx}').getrandbits(64) for idx in range(count)]
+
+
+def simulate(hands, number_of_players=4, workers=None, seed=0, shard_size=SHARD_SIZE):
+    sizes = [shard_size] * (hands // shard_size)
+    if hands % shard_size:
+        sizes.append(hands % shard_size)
+    seeds = shard_seeds(seed, len(sizes))
+    result = SimulationResult(number_of_players)
+    if workers == 1:
+        for size, shard_seed in zip(sizes, seeds):
+            result.merge(play_shard(number_of_players, size, shard_seed))
+        return result
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(play_shard, [number_of_players] * len(sizes), sizes, seeds):
+            result.merge(part)
+    return result
+
+
+if __name__ == '__main__':
+    hands = 100000
+    for workers in sorted({1, os.cpu_count()}):
+        start = time.perf_counter()
+        result = simulate(hands, 6, workers=workers, shard_size=5000)
+        seconds = time.perf_counter() - start
+        print(f'{workers} worker(s): {hands / seconds:.0f} hands/s')
+    print(result)
+    print(result.action_frequencies())
@@ -0,0 +1,159 @@
+# Immutable snapshots of a table in the middle of a hand, for bots that try "what if I raise here" many times.
+# A snapshot never changes, so forking one is handing it out again, and a changed snapshot shares every part
+# it does not change with the one it came from: the deck stays one tuple with a count of the cards left,
+# the actions are a linked list that grows at its head. Restoring writes the parts back into the same
+# Game, Player and Deck objects; the cards are the interned Cards, nothing is copied but references.
+#   state = take_snapshot(game, players, deck)
+#   for action in ('raise', 'call'):
+#       restore(state, game, players, deck)
+#       ...
+
+
+def _freeze(cards):
+    # the cards of a hand or the board as they are kept in a snapshot, a mask stays a mask
+    return cards if cards.__class__ is int else tuple(cards)
+
+
+def _thaw(current, cards):
+    # the cards to put back where `current` was: into the same list when both are lists, else as they were kept
+    if cards.__class__ is int:
+        return cards
+    if current.__class__ is list:
+        current[:] = cards
+        return current
+    return list(cards)
+
+
+# the state of Game.betting, its Chips are kept with the chips
+BETTING_FIELDS = ('live', 'all_in', 'street', 'raises', 'closed', 'stake', 'pending', 'to_act')
+
+
+class TableState:
+    __slots__ = ('deck', 'deck_size', 'players', 'numbers', 'stakes', 'hole', 'flop', 'turn', 'river', 'actions',
+                 'action_count', 'folded', 'dealer', 'small_blind', 'big_blind', 'biggest_stake', 'pot',
+                 'opponents', 'chips', 'betting', 'counts', 'big_blind_stake', 'winner', 'winners', 'payouts')
+
+    def fork(self):
+        return self
+
+    def replace(self, **changes):
+        state = object.__new__(TableState)
+        for name in TableState.__slots__:
+            object.__setattr__(state, name, changes[name] if name in changes else getattr(self, name))
+        return state
+
+    def __setattr__(self, name, value):
+        raise AttributeError('a TableState does not change, use replace')
+
+    def remaining(self):
+        # the cards left in the deck, the next one drawn is the last
+        return self.deck[:self.deck_size]
+
+    def draw(self, count):
+        # the cards Deck.draw_cards would give and the state after drawing them, the deck tuple is shared
+        if count > self.deck_size:
+            raise IndexError('draw from an empty deck')
+        cards = self.deck[self.deck_size - count:self.deck_size][::-1]
+        return cards, self.replace(deck_size=self.deck_size - count)
+
+    def stake_list(self):
+        actions = []
+        node = self.actions
+        while node is not None:
+            actions.append(node[0])
+            node = node[1]
+        actions.reverse()
+        return actions
+
+    def with_action(self, player, action, stake, biggest_stake=None):
+        # the state after the player made `action` with `stake`, in O(players)
+        idx = self.players.index(player)
+        changes = {'actions': (action, self.actions), 'action_count': self.action_count + 1,
+                   'stakes': self.stakes[:idx] + (stake,) + self.stakes[idx + 1:]}
+        if biggest_stake is not None:
+            changes['biggest_stake'] = biggest_stake
+        if action == 'fold':
+            changes['folded'] = self.folded + (player,)
+        return self.replace(**changes)
+
+    def __str__(self):
+        return f'TableState {len(self.players)} players, {self.action_count} actions, {self.deck_size} cards left'
+
+    def __repr__(self):
+        return str(self)
+
+
+def take_snapshot(game, players, deck):
+    # players: the list the hand is played with, the players who left it are not in it
+    actions = None
+    for action in game.stake_list:
+        actions = (action, actions)
+    chips = betting = None
+    game_chips = game.chips if game.betting is None else game.betting.chips
+    if game_chips is not None:
+        chips = (tuple(game_chips.stacks), tuple(game_chips.total), tuple(game_chips.street),
+                 tuple(game_chips.folded), tuple(tuple(street) for street in game_chips.streets))
+    if game.betting is not None:
+        betting = tuple(getattr(game.betting, name) for name in BETTING_FIELDS)
+    values = {
+        'deck': tuple(deck.cards), 'deck_size': len(deck.cards), 'players': tuple(players),
+        'numbers': tuple(player.player_number for player in players),
+        'stakes': tuple(player.player_stake for player in players),
+        'hole': tuple(_freeze(player.cards[0]) for player in players),
+        'flop': _freeze(game.flop), 'turn': _freeze(game.turn), 'river': _freeze(game.river),
+        'actions': actions, 'action_count': len(game.stake_list), 'folded': tuple(game.deleted_ones),
+        'dealer': game.dealer, 'small_blind': game.small_blind, 'big_blind': game.big_blind,
+        'biggest_stake': game.biggest_stake, 'pot': game.pot, 'opponents': game.opponents, 'chips': chips,
+        'betting': betting, 'counts': tuple(game.actions.items()), 'big_blind_stake': game.big_blind_stake,
+        'winner': game.winner, 'winners': tuple(game.winners),
+        'payouts': None if game.payouts is None else tuple(game.payouts),
+    }
+    state = object.__new__(TableState)
+    for name, value in values.items():
+        object.__setattr__(state, name, value)
+    return state
+
+
+def restore(state, game, players, deck):
+    # puts the table back as it was in the snapshot, into the lists the game already has
+    deck.cards[:] = state.deck[:state.deck_size]
+    players[:] = state.players
+    for player, number, stake, hole in zip(state.players, state.numbers, state.stakes, state.hole):
+        player.player_number = number
+        player.player_stake = stake
+        if player.cards:
+            player.cards[0] = _thaw(player.cards[0], hole)
+            del player.cards[1:]
+        else:
+            player.cards.append(_thaw(None, hole))
+    game.flop = _thaw(game.flop, state.flop)
+    game.turn = _thaw(game.turn, state.turn)
+    game.river = _thaw(game.river, state.river)
+    game.stake_list[:] = state.stake_list()
+    game.deleted_ones[:] = state.folded
+    game.dealer = state.dealer
+    game.small_blind = state.small_blind
+    game.big_blind = state.big_blind
+    game.biggest_stake = state.biggest_stake
+    game.pot = state.pot
+    game.opponents = state.opponents
+    game.big_blind_stake = state.big_blind_stake
+    # what the hand has counted and won so far: a branch that went on to the showdown leaves its winners
+    game.actions.clear()
+    game.actions.update(state.counts)
+    game.winner = state.winner
+    game.winners[:] = state.winners
+    game.payouts = None if state.payouts is None else list(state.payouts)
+    # the hand states follow the board, another runout needs them built again
+    game.hand_states.clear()
+    if state.betting is not None:
+        for name, value in zip(BETTING_FIELDS, state.betting):
+            setattr(game.betting, name, value)
+    if state.chips is not None:
+        chips = game.chips if game.betting is None else game.betting.chips
+        stacks, total, street, folded, streets = state.chips
+        chips.stacks[:] = stacks
+        chips.total[:] = total
+        chips.street[:] = street
+        chips.folded[:] = folded
+        chips.streets[:] = [list(street) for street in streets]
@@ -0,0 +1,355 @@
+# Counterfactual regret minimization (CFR+) for a heads-up hand from the turn or the river on, with a short
+# abstraction of the Game's betting: on every street each player acts once, first the one out of position.
+# Before a raise he may check, call (bet the biggest stake carried over from the streets before) or raise
+# (double it); facing a raise the other one may fold, call or reraise (double it again). Then both pay the
+# biggest stake, or nothing when both checked.
+# The cards are abstracted into buckets by hand strength: on the river the percentile of the hand among all
+# hands on the board, on the turn the average of it over the river cards; a river state is (turn bucket,
+# river bucket). The strategies never see the river card itself, so the chance of every river is summed into
+# the payoff matrices between the states once, and an iteration is a walk over the betting tree with
+# vectors over the states. Regrets and strategies are flat NumPy arrays, one row per information set
+# (node, state) and one column per action.
+#   solver = Solver(board, pot=40, stake=4)
+#   solver.solve(1000, checkpoint='river.npz')
+#   solver.policy(['check'], hole_cards)
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_evaluator import evaluate_batch
+from ranges import COMBOS, COMBO_MASKS
+from Texas_holdem import card_mask, card_numbers
+
+TURN_BUCKETS = 8
+RIVER_BUCKETS = 10
+MAX_ACTIONS = 3
+
+
+class Node:
+    __slots__ = ('kind', 'player', 'street', 'actions', 'children', 'offset', 'winner', 'paid')
+
+    def __init__(self, kind, street, player=0, actions=(), winner=0, paid=(0, 0)):
+        self.kind = kind  # 'decision', 'fold' or 'showdown'
+        self.street = street  # 0 for the first street of the subgame
+        self.player = player
+        self.actions = list(actions)
+        self.children = []
+        self.offset = 0  # the first information set of the node
+        self.winner = winner  # who is left when the other one folds
+        self.paid = paid  # chips each player has put in during the subgame
+
+
+def build_tree(streets, stake):
+    # the betting of `streets` streets from a biggest stake `stake` on, the nodes in depth first order
+    nodes = []
+
+    def street(idx, stake, paid):
+        first = Node('decision', idx, 0, ['check', 'call', 'raise'])
+        nodes.append(first)
+        for action in first.actions:
+            raised = action == 'raise'
+            level = stake * 2 if raised else stake
+            second = Node('decision', idx, 1, ['fold', 'call', 'reraise'] if raised else ['check', 'call', 'raise'])
+            first.children.append(len(nodes))
+            nodes.append(second)
+            for reply in second.actions:
+                if reply == 'fold':
+                    second.children.append(len(nodes))
+                    nodes.append(Node('fold', idx, winner=0, paid=paid))
+                    continue
+                final = level * 2 if reply in ('raise', 'reraise') else level
+                pay = 0 if action == 'check' and reply == 'check' else final
+                now = (paid[0] + pay, paid[1] + pay)
+                if idx + 1 == streets:
+                    second.children.append(len(nodes))
+                    nodes.append(Node('showdown', idx, paid=now))
+                else:
+                    second.children.append(street(idx + 1, final, now))
+        return nodes.index(first)
+
+    street(0, stake, (0, 0))
+    return nodes
+
+
+def _percentiles(values):
+    # the share of the hands below every hand, ties count half
+    distinct, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    below = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return (below[inverse] + (counts[inverse] - 1) / 2) / max(len(values) - 1, 1)
+
+
+def _buckets(strength, count):
+    # equal sized buckets by strength
+    order = np.argsort(strength, kind='stable')
+    buckets = np.empty(len(strength), dtype=np.intp)
+    buckets[order] = np.arange(len(strength)) * count // len(strength)
+    return buckets
+
+
+def _showdown(values):
+    # the share of the pot of the row hand against the column hand
+    return (values[:, None] > values[None, :]) + 0.5 * (values[:, None] == values[None, :])
+
+
+def river_matrices(board, hands, weights, rivers, turn_buckets, river_buckets):
+    # the payoff matrices between the river states summed over `rivers`: the share the first player wins
+    # and the weight of the pairs of hands
+    states = turn_buckets.max() + 1 if turn_buckets is not None else 0
+    size = states * river_buckets if turn_buckets is not None else river_buckets
+    shares = np.zeros((size, size))
+    pairs = np.zeros((size, size))
+    apart = (COMBO_MASKS[hands][:, None] & COMBO_MASKS[hands][None, :]) == 0
+    for river in rivers:
+        full = list(board) + ([river] if river is not None else [])
+        valid = (COMBO_MASKS[hands] & np.uint64(card_mask(full))) == 0
+        cards = np.empty((valid.sum(), 7), dtype=np.intp)
+        cards[:, :5] = full
+        cards[:, 5:] = COMBOS[hands[valid]]
+        values = evaluate_batch(cards)
+        buckets = _buckets(_percentiles(values), river_buckets)
+        if turn_buckets is not None:
+            buckets = turn_buckets[valid] * river_buckets + buckets
+        indicator = np.zeros((valid.sum(), size))
+        indicator[np.arange(valid.sum()), buckets] = 1
+        weight = apart[np.ix_(valid, valid)] * weights[0][valid][:, None] * weights[1][valid][None, :]
+        shares += indicator.T @ (_showdown(values) * weight) @ indicator
+        pairs += indicator.T @ weight @ indicator
+    return shares, pairs
+
+
+class Solver:
+    def __init__(self, board, pot, stake, ranges=None, turn_buckets=TURN_BUCKETS, river_buckets=RIVER_BUCKETS,
+                 workers=None):
+        # board: 4 (turn) or 5 (river) cards, pot: the chips in the pot, stake: Game.biggest_stake;
+        # ranges: the weights of the 1326 hole cards of both players, any hand by default
+        self.board = card_numbers(board)
+        if len(self.board) not in (4, 5):
+            raise ValueError('The solver starts on the turn or on the river')
+        self.pot = pot
+        self.stake = stake
+        self.streets = 6 - len(self.board)
+        self.settings = {'board': self.board, 'pot': pot, 'stake': stake, 'turn_buckets': turn_buckets,
+                         'river_buckets': river_buckets, 'ranges': ranges is not None}
+        if ranges is None:
+            ranges = (np.ones(len(COMBOS)), np.ones(len(COMBOS)))
+        used = np.uint64(card_mask(self.board))
+        self.hands = np.flatnonzero(((COMBO_MASKS & used) == 0) & ((ranges[0] > 0) | (ranges[1] > 0)))
+        weights = (ranges[0][self.hands], ranges[1][self.hands])
+        self.river_buckets = river_buckets
+        self.abstract(weights, turn_buckets, workers)
+
+        self.nodes = build_tree(self.streets, stake)
+        infosets = 0
+        for node in self.nodes:
+            if node.kind == 'decision':
+                node.offset = infosets
+                infosets += self.states[node.street]
+        self.regrets = np.zeros((infosets, MAX_ACTIONS))
+        self.strategy_sums = np.zeros((infosets, MAX_ACTIONS))
+        self.iterations = 0
+
+    def abstract(self, weights, turn_buckets, workers):
+        if self.streets == 1:
+            self.hand_buckets = [self.bucket_river(self.board, None)]
+            shares, pairs = river_matrices(self.board, self.hands, weights, [None], None, self.river_buckets)
+            self.states = [self.river_buckets]
+            self.matrices = [(shares, pairs)]
+        else:
+            rivers = [card for card in range(52) if card not in self.board]
+            percentiles = np.zeros(len(self.hands))
+            for river in rivers:
+                valid = (COMBO_MASKS[self.hands] & np.uint64(1 << river)) == 0
+                percentiles[valid] += self.river_percentiles(self.board + [river], valid)
+            # every hand misses 46 of the 48 river cards
+            turn = _buckets(percentiles / (len(rivers) - 2), turn_buckets)
+            self.hand_buckets = [turn]
+            indicator = np.zeros((len(self.hands), turn_buckets))
+            indicator[np.arange(len(self.hands)), turn] = 1
+            apart = (COMBO_MASKS[self.hands][:, None] & COMBO_MASKS[self.hands][None, :]) == 0
+            turn_pairs = indicator.T @ (apart * weights[0][:, None] * weights[1][None, :]) @ indicator
+            parts = [rivers[idx::workers or 1] for idx in range(workers or 1)]
+            arguments = ([self.board] * len(parts), [self.hands] * len(parts), [weights] * len(parts), parts,
+                         [turn] * len(parts), [self.river_buckets] * len(parts))
+            if workers and workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(river_matrices, *arguments))
+            else:
+                results = [river_matrices(*args) for args in zip(*arguments)]
+            # a pair of hands sees 44 river cards, each as likely
+            shares = sum(result[0] for result in results) / (len(rivers) - 4)
+            pairs = sum(result[1] for result in results) / (len(rivers) - 4)
+            self.states = [turn_buckets, turn_buckets * self.river_buckets]
+            self.matrices = [(None, turn_pairs), (shares, pairs)]
+        total = self.matrices[0][1].sum()
+        self.matrices = [(None if shares is None else shares / total, pairs / total) for shares, pairs in self.matrices]
+
+    def river_percentiles(self, full, valid):
+        cards = np.empty((valid.sum(), 7), dtype=np.intp)
+        cards[:, :5] = full
+        cards[:, 5:] = COMBOS[self.hands[valid]]
+        return _percentiles(evaluate_batch(cards))
+
+    def bucket_river(self, full, valid):
+        if valid is None:
+            valid = np.ones(len(self.hands), dtype=bool)
+        return _buckets(self.river_percentiles(full, valid), self.river_buckets)
+
+    def current_strategy(self, node, regrets=None):
+        regrets = self.regrets if regrets is None else regrets
+        positive = regrets[node.offset:node.offset + self.states[node.street], :len(node.actions)]
+        total = positive.sum(axis=1, keepdims=True)
+        return np.where(total > 0, positive / np.where(total > 0, total, 1), 1 / len(node.actions))
+
+    def average_strategy(self, node):
+        sums = self.strategy_sums[node.offset:node.offset + self.states[node.street], :len(node.actions)]
+        total = sums.sum(axis=1, keepdims=True)
+        return np.where(total > 0, sums / np.where(total > 0, total, 1), 1 / len(node.actions))
+
+    def terminal(self, node, reach):
+        shares, pairs = self.matrices[node.street]
+        if node.kind == 'fold':
+            loser = 1 - node.winner
+            won = np.zeros(2)
+            won[node.winner] = self.pot + node.paid[loser]
+            won[loser] = -node.paid[loser]
+            return pairs @ reach[1] * won[0], pairs.T @ reach[0] * won[1]
+        total = self.pot + node.paid[0] + node.paid[1]
+        return (shares @ reach[1] * total - pairs @ reach[1] * node.paid[0],
+                (pairs - shares).T @ reach[0] * total - pairs.T @ reach[0] * node.paid[1])
+
+    def walk(self, index, reach, mode, deltas=None):
+        # counterfactual values of both players at the node, for every state of the node's street.
+        # mode 'cfr': the current strategies, regret and strategy updates go to deltas;
+        # 'average': the average strategies; 0 or 1: that player best responds to the other one's average
+        node = self.nodes[index]
+        if node.kind != 'decision':
+            return self.terminal(node, reach)
+        if mode == 'cfr':
+            strategy = self.current_strategy(node)
+        else:
+            strategy = self.average_strategy(node)
+        player = node.player
+        values = []
+        for action, child in enumerate(node.children):
+            child_reach = list(reach)
+            child_reach[player] = reach[player] * strategy[:, action]
+            if self.nodes[child].street != node.street:
+                # the river comes: every turn state becomes a river state with each river bucket
+                expanded = [np.repeat(vector, self.river_buckets) for vector in child_reach]
+                value = self.walk(child, expanded, mode, deltas)
+                value = tuple(vector.reshape(-1, self.river_buckets).sum(axis=1) for vector in value)
+            else:
+                value = self.walk(child, child_reach, mode, deltas)
+            values.append(value)
+        own = np.stack([value[player] for value in values], axis=1)
+        other = sum(value[1 - player] for value in values)
+        if mode == player:
+            mine = own.max(axis=1)
+        else:
+            mine = (own * strategy).sum(axis=1)
+        if mode == 'cfr':
+            rows = slice(node.offset, node.offset + len(mine))
+            deltas[0][rows, :len(node.actions)] += own - mine[:, None]
+            deltas[1][rows, :len(node.actions)] += reach[player][:, None] * strategy
+        return (mine, other) if player == 0 else (other, mine)
+
+    def iterate(self):
+        # one CFR+ iteration with both players updating at once, the average weighs iteration t by t
+        deltas = (np.zeros_like(self.regrets), np.zeros_like(self.strategy_sums))
+        self.walk(0, [np.ones(self.states[0]), np.ones(self.states[0])], 'cfr', deltas)
+        self.iterations += 1
+        np.maximum(self.regrets + deltas[0], 0, out=self.regrets)
+        self.strategy_sums += self.iterations * deltas[1]
+
+    def exploitability(self):
+        # what best responses win against the average strategies, above the value of the pot, per hand
+        ones = [np.ones(self.states[0]), np.ones(self.states[0])]
+        first = self.walk(0, ones, 0)[0].sum()
+        second = self.walk(0, ones, 1)[1].sum()
+        return float(first + second - self.pot) / 2
+
+    def value(self):
+        # what the first player wins on average when both play the average strategies
+        return self.walk(0, [np.ones(self.states[0]), np.ones(self.states[0])], 'average')[0].sum().item()
+
+    def solve(self, iterations, checkpoint=None, checkpoint_every=100):
+        # runs up to `iterations` iterations in all, going on from the checkpoint when there is one
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self.load(checkpoint)
+        while self.iterations < iterations:
+            self.iterate()
+            if checkpoint is not None and self.iterations % checkpoint_every == 0:
+                self.save(checkpoint)
+        if checkpoint is not None:
+            self.save(checkpoint)
+        return self
+
+    def save(self, path):
+        with open(path + '.tmp', 'wb') as file:
+            np.savez(file, regrets=self.regrets, strategy_sums=self.strategy_sums,
+                     iterations=self.iterations, settings=json.dumps(self.settings))
+        os.replace(path + '.tmp', path)
+
+    def load(self, path):
+        with np.load(path) as data:
+            if json.loads(str(data['settings'])) != self.settings:
+                raise ValueError(f'{path} is a checkpoint of another subgame')
+            self.regrets = data['regrets']
+            self.strategy_sums = data['strategy_sums']
+            self.iterations = int(data['iterations'])
+
+    def node_of(self, history):
+        # the decision node after the actions in `history`, from the start of the subgame
+        index = 0
+        for action in history:
+            node = self.nodes[index]
+            index = node.children[node.actions.index(action)]
+        if self.nodes[index].kind != 'decision':
+            raise ValueError(f'Nobody acts after {history}')
+        return index
+
+    def state_of(self, street, hole_cards, river=None):
+        hand = np.flatnonzero(COMBO_MASKS[self.hands] == np.uint64(card_mask(hole_cards)))
+        if not hand.size:
+            raise ValueError('The hole cards are on the board or out of the ranges')
+        if self.streets == 1:
+            return self.hand_buckets[0][hand[0]]
+        turn = self.hand_buckets[0][hand[0]]
+        if street == 0:
+            return turn
+        valid = (COMBO_MASKS[self.hands] & np.uint64(1 << river)) == 0
+        buckets = np.full(len(self.hands), -1)
+        buckets[valid] = self.bucket_river(self.board + [river], valid)
+        return turn * self.river_buckets + buckets[hand[0]]
+
+    def policy(self, history, hole_cards, river=None):
+        # {action: probability} of the average strategy; on the river of a turn subgame give the river card
+        index = self.node_of(history)
+        node = self.nodes[index]
+        state = self.state_of(node.street, card_numbers(hole_cards), river)
+        return dict(zip(node.actions, self.average_strategy(node)[state].tolist()))
+
+
+def solve_many(subgames, iterations, workers=None):
+    # independent subgames, (board, pot, stake) each, solved in parallel processes
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_solve, subgames, [iterations] * len(subgames)))
+
+
+def _solve(subgame, iterations):
+    return Solver(*subgame).solve(iterations)
+
+
+if __name__ == '__main__':
+    import time
+    for board in ([0, 14, 30, 40, 50], [0, 14, 30, 40]):
+        start = time.perf_counter()
+        solver = Solver(board, pot=40, stake=4)
+        built = time.perf_counter()
+        for target in (100, 300, 1000):
+            solver.solve(target)
+            print(f'{len(board)} cards, {target} iterations: exploitability {solver.exploitability():.3f} chips, '
+                  f'value {solver.value():.3f}')
+        print(f'abstraction {built - start:.1f} s, solving {time.perf_counter() - built:.1f} s')
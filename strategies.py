@@ -0,0 +1,163 @@
+# Strategies playing against each other. Every hand the strategies take turns in the seats, every seat starts
+# with a deep stack, and what a strategy wins is counted in big blinds per 100 hands.
+# Hands are played in seeded shards on all cores; after every round of shards the match stops
+# as soon as every strategy is significantly winning or losing. A shard keeps what every seat won as one
+# NumPy array and credits the strategies and sums their results with array operations, not hand by hand.
+# Any strategy may fold on any street, the Game takes the folded player out of the hand
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from preflop import MAX_OPPONENTS, preflop_place
+from simulator import shard_seeds
+from Texas_holdem import DRAW_OUTS, STRONG_HANDS, Strategy, card_numbers, play_hand
+
+SHARD_SIZE = 5000
+DEEP_STACK = 1 << 40  # chips, so nobody is ever all-in
+Z = 1.96  # the reported 95% confidence intervals
+STOP_Z = 3.0  # looking after every round needs a stricter bound to stop on
+MIN_HANDS = 20000
+
+
+class CallingStation(Strategy):
+    def preflop(self, pl, game):
+        return game.call()
+
+    def street(self, pl, game, r, board):
+        return game.call()
+
+
+class Maniac(Strategy):
+    def preflop(self, pl, game):
+        return self.street(pl, game, 'preflop', [])
+
+    def street(self, pl, game, r, board):
+        return game.make_raise()
+
+
+class Tight(Strategy):
+    # only the strong starting hands play, then the Game's heuristic
+    def preflop(self, pl, game):
+        first, second = card_numbers(pl.cards[0])
+        opponents = min(max(game.betting.live.bit_count() - 1, 1), MAX_OPPONENTS)
+        if preflop_place(first, second, opponents) >= STRONG_HANDS:
+            return game.fold(pl)
+        return game.evaluate_starting_hands(pl)
+
+
+class Drawer(Strategy):
+    # raises on the flop with a good draw, otherwise the Game's heuristic
+    def street(self, pl, game, r, board):
+        if r == 'flop' and game.betting.raises == 0 and game.flop_outs(pl, board) >= DRAW_OUTS:
+            return game.make_raise()
+        return game.evaluate_combination(pl, r, board)
+
+
+class MatchResult:
+    def __init__(self, strategies):
+        self.names = [strategy.__class__.__name__ for strategy in strategies]
+        self.hands = 0
+        self.totals = [0.0] * len(strategies)  # big blinds won
+        self.squares = [0.0] * len(strategies)
+
+    def add_hands(self, results):
+        # results: a (hands, strategies) array of the big blinds every strategy won in every hand
+        self.hands += len(results)
+        for idx, (total, square) in enumerate(zip(results.sum(axis=0), (results * results).sum(axis=0))):
+            self.totals[idx] += float(total)
+            self.squares[idx] += float(square)
+
+    def merge(self, other):
+        self.hands += other.hands
+        for idx in range(len(self.totals)):
+            self.totals[idx] += other.totals[idx]
+            self.squares[idx] += other.squares[idx]
+        return self
+
+    def bb_per_100(self, idx):
+        return 100 * self.totals[idx] / self.hands
+
+    def deviation(self, idx):
+        # the standard error of bb/100
+        mean = self.totals[idx] / self.hands
+        return 100 * math.sqrt(max(self.squares[idx] / self.hands - mean * mean, 0) / self.hands)
+
+    def interval(self, idx, z=Z):
+        return self.bb_per_100(idx) - z * self.deviation(idx), self.bb_per_100(idx) + z * self.deviation(idx)
+
+    def significant(self, z=STOP_Z):
+        for idx in range(len(self.totals)):
+            low, high = self.interval(idx, z)
+            if low <= 0 <= high:
+                return False
+        return True
+
+    def __str__(self):
+        lines = [f'Match of {self.hands} hands']
+        for idx, name in enumerate(self.names):
+            low, high = self.interval(idx)
+            lines.append(f'{name:16} {self.bb_per_100(idx):+9.2f} bb/100  [{low:+.2f}, {high:+.2f}]')
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return str(self)
+
+
+def play_match_shard(strategies, number_of_players, hands, seed):
+    rng = random.Random(seed)
+    result = MatchResult(strategies)
+    stacks = [DEEP_STACK] * number_of_players
+    # the strategies move one seat every hand
+    owners = (np.arange(hands)[:, None] + np.arange(number_of_players)) % len(strategies)
+    won = np.empty((hands, number_of_players))  # big blinds by hand and seat
+    for idx, row in enumerate(owners.tolist()):
+        game, players = play_hand(number_of_players, rng=rng, stacks=stacks,
+                                  strategies=[strategies[owner] for owner in row])
+        won[idx] = game.payouts
+        won[idx] -= game.chips.total
+        won[idx] /= game.big_blind_stake
+    results = np.zeros((hands, len(strategies)))
+    np.add.at(results, (np.arange(hands)[:, None], owners), won)
+    result.add_hands(results)
+    return result
+
+
+def match(strategies, hands=1000000, number_of_players=6, workers=None, seed=0, shard_size=SHARD_SIZE,
+          min_hands=MIN_HANDS):
+    # plays up to `hands` hands, a round of shards at a time, and stops once the result is significant
+    count = -(-hands // shard_size)
+    sizes = [shard_size] * count
+    sizes[-1] = hands - shard_size * (count - 1)
+    seeds = shard_seeds(seed, count)
+    result = MatchResult(strategies)
+    workers = workers or os.cpu_count()
+    per_round = workers * 2
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for start in range(0, count, per_round):
+            shards = range(start, min(start + per_round, count))
+            if pool is None:
+                parts = [play_match_shard(strategies, number_of_players, sizes[idx], seeds[idx]) for idx in shards]
+            else:
+                parts = pool.map(play_match_shard, [strategies] * len(shards), [number_of_players] * len(shards),
+                                 [sizes[idx] for idx in shards], [seeds[idx] for idx in shards])
+            for part in parts:
+                result.merge(part)
+            if result.hands >= min_hands and result.significant():
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return result
+
+
+if __name__ == '__main__':
+    for opponent in (CallingStation(), Maniac(), Tight(), Drawer()):
+        start = time.perf_counter()
+        result = match([Strategy(), opponent], hands=200000)
+        print(result)
+        print(f'{result.hands / (time.perf_counter() - start):.0f} hands/s')
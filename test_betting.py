@@ -0,0 +1,75 @@
+from betting import Betting
+from chips import Chips
+
+
+def test_heads_up_blinds_and_order():
+    # the button posts the small blind and acts first before the flop, last after it
+    betting = Betting(Chips([100, 100]), button=2, small_blind=1, big_blind=2)
+    assert (betting.small_blind, betting.big_blind, betting.to_act) == (2, 1, 2)
+    assert betting.chips.street == [2, 1]
+    betting.act('call')
+    betting.act('check')
+    assert betting.street_over()
+    betting.next_street()
+    assert betting.to_act == 1
+
+
+def test_big_blind_option():
+    # everybody calls, the big blind still gets to check or raise
+    betting = Betting(Chips([100] * 4), button=4, small_blind=1, big_blind=2)
+    assert betting.to_act == 3
+    for seat in (3, 4, 1):
+        assert betting.to_act == seat
+        betting.act('call')
+    assert not betting.street_over()
+    assert betting.to_act == 2
+    assert betting.legal() == ['check', 'raise']
+    assert betting.act('raise') == 'raise'
+    assert betting.to_act == 3 and betting.pending == 0b1101
+
+
+def test_short_all_in_is_a_call():
+    betting = Betting(Chips([1000, 1000, 1000, 3]), button=4, small_blind=1, big_blind=2)
+    assert betting.act('raise') == 'raise'
+    assert betting.to_act == 4
+    # 3 chips do not cover the 4 to call
+    assert betting.legal() == ['fold', 'call']
+    assert betting.act('call') == 'call'
+    assert (betting.stake, betting.raises) == (4, 1)
+    assert betting.pending == 0b0011 and betting.all_in == 0b1000
+
+
+def test_short_all_in_raise_does_not_reopen_the_action():
+    betting = Betting(Chips([1000, 1000, 1000, 6]), button=4, small_blind=1, big_blind=2)
+    betting.act('raise')  # seat 3 to 4
+    assert betting.act('raise') == 'reraise'  # seat 4 all-in for 6, short of 8
+    assert (betting.stake, betting.raises) == (6, 1)
+    betting.act('call')
+    betting.act('call')
+    # seat 3 raised before the all-in, he may call the rest or fold
+    assert betting.to_act == 3
+    assert betting.legal() == ['fold', 'call']
+    betting.act('call')
+    assert betting.street_over()
+    assert betting.chips.street == [6, 6, 6, 6]
+
+
+def test_street_ends_when_the_stakes_match():
+    betting = Betting(Chips([100] * 3), button=1, small_blind=1, big_blind=2)
+    betting.act('raise')  # the button to 4
+    betting.act('fold')
+    assert not betting.street_over()
+    betting.act('call')
+    assert betting.street_over() and not betting.hand_over()
+    betting.next_street()
+    assert (betting.street, betting.stake, betting.to_act) == (1, 0, 3)
+    betting.act('check')
+    betting.act('check')
+    assert betting.street_over()
+
+
+def test_hand_over_when_everyone_else_folds():
+    betting = Betting(Chips([100] * 3), button=1, small_blind=1, big_blind=2)
+    betting.act('fold')
+    betting.act('fold')
+    assert betting.hand_over() and betting.live == 0b100
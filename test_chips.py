@@ -0,0 +1,54 @@
+from chips import Chips
+
+
+def put(chips, stakes):
+    for seat, stake in enumerate(stakes, 1):
+        chips.put_to(seat, stake)
+
+
+def test_side_pots_of_two_all_ins():
+    chips = Chips([50, 100, 300, 300])
+    put(chips, [50, 100, 300, 300])
+    pots = [[chips, sorted(seats)] for chips, seats in chips.side_pots()]
+    assert pots == [[200, [1, 2, 3, 4]], [150, [2, 3, 4]], [400, [3, 4]]]
+    assert chips.all_in(1) and chips.all_in(3)
+
+
+def test_folded_chips_stay_in_the_pot():
+    chips = Chips([100, 100, 100])
+    put(chips, [40, 100, 100])
+    chips.fold(1)
+    assert chips.side_pots() == [[240, [2, 3]]]
+
+
+def test_short_stack_wins_only_the_main_pot():
+    chips = Chips([50, 100, 100])
+    put(chips, [50, 100, 100])
+    won = chips.settle({1: 9, 2: 5, 3: 1})
+    assert won == [150, 100, 0] and chips.stacks == [150, 100, 0]
+    assert sum(won) == chips.amount()
+
+
+def test_odd_chips_go_left_of_the_button():
+    chips = Chips([100, 100, 100])
+    put(chips, [33, 33, 35])
+    chips.fold(3)
+    # 101 chips split by seats 1 and 2: with the button on seat 1 seat 2 gets the odd one, on seat 2 seat 1 does
+    assert chips.settle({1: 7, 2: 7}, button=1) == [50, 51, 0]
+    chips = Chips([100, 100, 100])
+    put(chips, [33, 33, 35])
+    chips.fold(3)
+    assert chips.settle({1: 7, 2: 7}, button=2) == [51, 50, 0]
+    # two odd chips among three winners: the two first left of the button
+    chips = Chips([100, 100, 100, 100])
+    put(chips, [33, 33, 33, 2])
+    chips.fold(4)
+    assert chips.settle({1: 7, 2: 7, 3: 7}, button=3) == [34, 34, 33, 0]
+
+
+def test_new_hand_keeps_the_stacks():
+    chips = Chips([100, 100])
+    put(chips, [10, 10])
+    chips.end_street()
+    chips.new_hand()
+    assert chips.stacks == [90, 90] and chips.total == [0, 0] and chips.streets == []
@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pytest
+
+from equity import _exact_equity, canonical_key, equity, exact_equity
+from evaluator import evaluate
+
+
+def test_exact_on_the_turn_is_every_river():
+    hands = [[12, 25], [0, 13]]  # two aces against two deuces
+    board = [5, 18, 31, 9]
+    wins = ties = 0
+    for river in range(52):
+        if river in board or any(river in hand for hand in hands):
+            continue
+        first, second = (evaluate(hand + board + [river]) for hand in hands)
+        wins += first > second
+        ties += first == second
+    result = exact_equity(hands, board)[0]
+    assert result.exact and result.samples == 44
+    assert (round(result.win * 44), round(result.tie * 44)) == (wins, ties)
+
+
+def test_monte_carlo_within_its_interval():
+    hands = [[12, 25], [11, 24]]
+    exact = exact_equity(hands, [0, 14, 28])[0]
+    sampled = equity(hands, [0, 14, 28], n_samples=20000, rng=np.random.default_rng(1))
+    low, high = sampled[0].equity_ci
+    assert low <= exact.equity <= high
+
+
+def test_suits_swapped_share_the_cache():
+    # hearts and spades swapped, the same situation
+    hands = [[12, 11], [5, 18]]
+    swapped = [[51, 50], [44, 18]]
+    assert canonical_key(hands, [0, 1, 2]) == canonical_key(swapped, [39, 40, 41])
+    _exact_equity.cache_clear()
+    first, _ = exact_equity(hands, [0, 1, 2])
+    second, _ = exact_equity(swapped, [39, 40, 41])
+    assert _exact_equity.cache_info().hits == 1 and first.equity == second.equity
+
+
+def test_exact_equity_leaves_the_global_random_alone():
+    _exact_equity.cache_clear()
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+    exact_equity([[0, 13], [5, 30]], [1, 2, 3])
+    assert random.random() == expected
+
+
+def test_a_card_dealt_twice():
+    with pytest.raises(ValueError):
+        exact_equity([[0, 13], [13, 30]], [1, 2, 3])
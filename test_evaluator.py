@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+from itertools import combinations
+from random import Random
+
+from batch_evaluator import evaluate_batch, showdown_ranking
+from evalcache import EvalCache, canonical_mask
+from evaluator import (FLUSH, FLUSH_SUIT, FLUSH_TABLE, FULL_HOUSE, STRAIGHT, SUIT_KEYS, TWO_PAIRS, RankTable,
+                       category, evaluate, evaluate_mask, hand_name)
+from Texas_holdem import card_mask
+
+# card numbers are suit * 13 + value, the value 0 is a two and 12 an ace
+
+
+def cards(*pairs):
+    return [suit * 13 + value for value, suit in pairs]
+
+
+def test_categories():
+    assert hand_name(evaluate(cards((8, 0), (9, 0), (10, 0), (11, 0), (12, 0), (0, 1), (1, 2)))) == 'Royal Flush'
+    assert category(evaluate(cards((12, 0), (0, 1), (1, 2), (2, 3), (3, 0)))) == STRAIGHT
+    assert category(evaluate(cards((5, 0), (5, 1), (5, 2), (7, 0), (7, 1), (1, 2), (2, 3)))) == FULL_HOUSE
+    assert category(evaluate(cards((5, 0), (5, 1), (7, 2), (7, 0), (9, 1), (9, 2), (2, 3)))) == TWO_PAIRS
+
+
+def test_order_of_hands():
+    wheel = evaluate(cards((12, 0), (0, 1), (1, 2), (2, 3), (3, 0)))
+    six_high = evaluate(cards((4, 0), (0, 1), (1, 2), (2, 3), (3, 0)))
+    flush = evaluate(cards((0, 2), (2, 2), (4, 2), (6, 2), (9, 2)))
+    assert wheel < six_high < flush
+    # the kicker decides between two equal pairs
+    ace_kicker = evaluate(cards((5, 0), (5, 1), (12, 2), (3, 3), (1, 0)))
+    assert ace_kicker > evaluate(cards((5, 2), (5, 3), (11, 2), (3, 0), (1, 1)))
+
+
+def test_seven_cards_are_the_best_five():
+    rng = Random(1)
+    for _ in range(200):
+        hand = rng.sample(range(52), 7)
+        best = max(evaluate(five) for five in combinations(hand, 5))
+        assert evaluate(hand) == best == evaluate_mask(card_mask(hand))
+        assert max(evaluate(six) for six in combinations(hand, 6)) == best
+
+
+def test_flush_tables():
+    # five hearts make a flush of hearts, four of them do not
+    assert FLUSH_SUIT[sum(SUIT_KEYS[number] for number in cards((0, 0), (3, 0), (5, 0), (7, 0), (9, 0)))] == 0
+    assert FLUSH_SUIT[sum(SUIT_KEYS[number] for number in cards((0, 0), (3, 0), (5, 0), (7, 0), (9, 1)))] < 0
+    bits = 1 << 0 | 1 << 3 | 1 << 5 | 1 << 7 | 1 << 9
+    assert category(FLUSH_TABLE[bits]) == FLUSH
+    assert FLUSH_TABLE[bits] == evaluate(cards((0, 3), (3, 3), (5, 3), (7, 3), (9, 3)))
+
+
+def test_batch_agrees():
+    rng = Random(2)
+    hands = [rng.sample(range(52), 7) for _ in range(500)]
+    assert evaluate_batch(hands).tolist() == [evaluate(hand) for hand in hands]
+    assert showdown_ranking([0, 1, 2], []) == ([], [])
+    groups, values = showdown_ranking(cards((12, 0), (12, 1), (3, 2), (7, 3), (9, 0)), [[0, 1], [13, 14]])
+    assert groups == [[0, 1]] and len(values) == 1
+
+
+def test_rank_table_from_sorted_keys():
+    table = RankTable([3, 7, 20], [30, 70, 200])
+    assert table[7] == 70 and 20 in table and 4 not in table and len(table) == 3
+    assert table.get(4) is None
+
+
+def test_eval_cache(tmp_path):
+    cache = EvalCache(str(tmp_path / 'cache.bin'), 1)
+    rng = Random(3)
+    masks = [card_mask(rng.sample(range(52), 7)) for _ in range(100)]
+    assert [cache.evaluate(mask) for mask in masks] == [evaluate_mask(mask) for mask in masks]
+    assert cache.misses == 100
+    assert [cache.get(mask) for mask in masks] == [evaluate_mask(mask) for mask in masks]
+    # the same hand with the suits in reverse order
+    swapped = sum(1 << (3 - number // 13) * 13 + number % 13 for number in range(52) if masks[0] >> number & 1)
+    assert canonical_mask(swapped) == canonical_mask(masks[0])
+    cache.close()
+
+
+def test_one_hand_does_not_import_numpy():
+    code = 'import sys; from Texas_holdem import play_hand; play_hand(4); print("numpy" in sys.modules)'
+    run = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert run.stdout.strip() == 'False'
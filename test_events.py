@@ -0,0 +1,60 @@
+from random import Random
+
+from events import (CALL, DEAL, FOLD, KIND_NAMES, RECORD, BinaryWriter, NdjsonWriter, RingBuffer, read_ndjson,
+                    read_records)
+from history import HistoryReader, record_hands
+from Texas_holdem import play_hand
+
+RECORDS = [(0, DEAL, 1, 0, 0b11), (1 << 40, CALL, 3, 20, 0), (1 << 40, FOLD, 10, -1, 0)]
+
+
+def test_binary_round_trip(tmp_path):
+    path = str(tmp_path / 'events.bin')
+    with BinaryWriter(path, chunk_records=2) as writer:
+        for record in RECORDS:
+            writer.emit(*record)
+    assert RECORD.size == 26
+    assert list(read_records(path)) == RECORDS
+
+
+def test_ndjson_round_trip(tmp_path):
+    path = str(tmp_path / 'events.ndjson')
+    with NdjsonWriter(path) as writer:
+        for record in RECORDS:
+            writer.emit(*record)
+    lines = read_ndjson(path)
+    assert [(line['hand'], line['kind'], line['seat'], line['amount'], line['cards']) for line in lines] == \
+        [(hand, KIND_NAMES[kind], seat, amount, cards) for hand, kind, seat, amount, cards in RECORDS]
+
+
+def test_a_hand_recorded_is_the_hand_played(tmp_path):
+    path = str(tmp_path / 'hand.bin')
+    ring = RingBuffer()
+    with BinaryWriter(path) as writer:
+        play_hand(5, rng=Random(3), events=writer, hand=7)
+    play_hand(5, rng=Random(3), events=ring, hand=7)
+    assert list(read_records(path)) == ring.records()
+
+
+def test_ring_buffer_keeps_the_last():
+    ring = RingBuffer(2)
+    for record in RECORDS:
+        ring.emit(*record)
+    assert ring.records() == RECORDS[1:] and ring.total == 3
+
+
+def test_history_round_trip(tmp_path):
+    directory = str(tmp_path / 'history')
+    assert record_hands(directory, 200, number_of_players=4, seed=1) == 200
+    reader = HistoryReader(directory)
+    assert len(reader) == 200
+    for number in range(0, 200, 20):
+        record = reader.hand(number)
+        reader.replay(number)
+        if len(record.showdown) > 1:
+            assert reader.showdown_winners(number) == record.winners
+    assert reader.verify() == []
+
+
+def test_history_without_columns_is_empty(tmp_path):
+    assert len(HistoryReader(str(tmp_path))) == 0
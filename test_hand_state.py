@@ -0,0 +1,40 @@
+from evaluator import HandState, evaluate
+from Texas_holdem import Deck, Game, Player, card_mask, card_numbers
+
+
+def test_cards_added_street_by_street():
+    hole, board = [12, 25], [0, 14, 28, 40, 11]
+    state = HandState(hole)
+    for count, number in enumerate(board, 3):
+        state.add(number)
+        assert state.count == count
+        if count >= 5:
+            assert state.value() == evaluate(hole + board[:count - 2])
+    assert state.mask == card_mask(hole + board)
+    assert state.rank_counts()[12] == 2 and state.suit_counts() == [3, 2, 1, 1]
+
+
+def test_add_mask_skips_the_cards_it_has():
+    state = HandState([12, 25])
+    state.add_mask(card_mask([0, 14, 28]))
+    state.add_mask(card_mask([0, 14, 28, 40]))
+    assert state.count == 6 and state.value() == evaluate([12, 25, 0, 14, 28, 40])
+
+
+def test_game_keeps_one_state_per_player():
+    deck = Deck(rng=4)
+    player = Player(deck)
+    player.cards[0] = deck.draw_cards(2)
+    game = Game(False)
+    board = deck.draw_cards(5)
+    for count in (3, 4, 5):
+        game.make_combination(player, board[:count])
+        assert player.hand_rank == evaluate(card_numbers(player.cards[0]) + card_numbers(board[:count]))
+    state = game.hand_states[player]
+    # the same board as a mask goes on with the same state, another board starts over
+    game.make_combination(player, card_mask(board))
+    assert game.hand_states[player] is state
+    other = deck.draw_cards(3)
+    game.make_combination(player, other)
+    assert game.hand_states[player] is not state
+    assert player.hand_rank == evaluate(card_numbers(player.cards[0]) + card_numbers(other))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from equity import exact_equity
+from ranges import COMBO_INDEX, combo_weights, parse_range, range_equity, without_cards
+
+
+def combos(text):
+    return int(parse_range(text).sum())
+
+
+def test_parse_counts():
+    assert combos('QQ+') == 18
+    assert combos('AKs') == 4 and combos('AKo') == 12 and combos('AK') == 16
+    assert combos('A5s-A2s') == 16
+    assert combos('T8s+') == 8
+    assert combos('22+, AKs, T9s, KQo:0.5') == 78 + 4 + 4 + 6
+
+
+def test_weights_and_single_combos():
+    weights = parse_range('KQo:0.5, AhKh')
+    assert weights.max() == 1.0 and weights.sum() == 6 + 1
+    # a later hand overrides an earlier one
+    assert parse_range('AA, AA:0.25').sum() == 1.5
+
+
+@pytest.mark.parametrize('text', ['AAs', 'AX', 'AhAh', 'A5s-K2s', 'AKx'])
+def test_bad_ranges(text):
+    with pytest.raises(ValueError):
+        parse_range(text)
+
+
+def test_board_cards_take_combos_out():
+    weights = without_cards(parse_range('AA'), [12])  # the ace of hearts
+    assert weights.sum() == 3
+
+
+def test_range_of_single_hands_is_exact_equity():
+    board = [0, 14, 28]
+    hero = combo_weights([[12, 25]])
+    villain = combo_weights([[11, 24]])
+    expected = exact_equity([[12, 25], [11, 24]], board)[0]
+    result = range_equity(hero, villain, board)
+    assert np.isclose(result.equity, expected.equity) and np.isclose(result.win, expected.win)
+
+
+def test_ranges_against_each_other():
+    board = [0, 14, 28, 40]
+    result = range_equity(parse_range('QQ+'), parse_range('JJ-99'), board)
+    # the same as the weighted sum over every pair of combos
+    hero, villain = parse_range('QQ+'), parse_range('JJ-99')
+    shares = total = 0.0
+    for first in np.flatnonzero(without_cards(hero, board)):
+        for second in np.flatnonzero(without_cards(villain, board)):
+            one = [int(card) for card in np.argwhere(COMBO_INDEX == first)[0]]
+            two = [int(card) for card in np.argwhere(COMBO_INDEX == second)[0]]
+            if set(one) & set(two):
+                continue
+            shares += exact_equity([one, two], board)[0].equity
+            total += 1
+    assert np.isclose(result.equity, shares / total)
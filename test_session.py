@@ -0,0 +1,51 @@
+from events import BLIND, RingBuffer
+from session import Session
+from Texas_holdem import Strategy
+
+
+class Folder(Strategy):
+    # folds whenever there is something to pay
+    def preflop(self, pl, game):
+        return game.fold(pl) if game.betting.owes(pl.seat) else game.check()
+
+    def street(self, pl, game, r, board):
+        return self.preflop(pl, game)
+
+
+def test_stacks_stay_and_button_moves():
+    session = Session(4, stack=500, rng=1)
+    players = list(session.players)
+    deck = session.deck
+    button = session.button
+    for _ in range(50):
+        game = session.play_hand()
+        assert sum(session.chips.stacks) == 2000
+        assert game.dealer.seat == button
+        button = session.button
+    # the same Player and Deck objects all session long
+    assert session.players == players and session.deck is deck
+
+
+def test_busted_players_leave():
+    session = Session(3, stack=100, rng=2)
+    session.play(5000)
+    assert session.over()
+    assert len(session.eliminated) == 2
+    winner = session.standings()[0]
+    assert session.chips.stacks[winner - 1] == 300
+    assert session.standings()[1:] == session.eliminated[::-1]
+
+
+def test_blinds_go_up():
+    events = RingBuffer(1 << 12)
+    session = Session(3, stack=10 ** 6, levels=[(1, 2), (5, 10)], hands_per_level=2,
+                      strategies=[Folder()] * 3, events=events)
+    session.play(4)
+    blinds = [(hand, amount) for hand, kind, seat, amount, cards in events.records() if kind == BLIND]
+    assert blinds == [(0, 1), (0, 2), (1, 1), (1, 2), (2, 5), (2, 10), (3, 5), (3, 10)]
+
+
+def test_heads_up_button_posts_the_small_blind():
+    session = Session(2, stack=1000, rng=3)
+    game = session.play_hand()
+    assert game.small_blind is game.dealer
@@ -0,0 +1,87 @@
+from snapshot import restore, take_snapshot
+from Texas_holdem import Deck, Game, Player, hand_steps
+
+
+def start(seed, number_of_players=5):
+    deck = Deck(rng=seed)
+    players = [Player(deck, number) for number in range(1, number_of_players + 1)]
+    game = Game(False, stacks=[300] * number_of_players)
+    game.define_dealer(players)
+    for player in players:
+        deck.cards.append(player.cards[0])
+    deck.shuffle()
+    return game, players, deck
+
+
+def finish(game, players, deck):
+    # the rest of the hand from the flop on, as hand_steps plays it
+    board = list(game.flop)
+    for street, count in (('flop', 0), ('turn', 1), ('river', 1)):
+        board = board + deck.draw_cards(count)
+        setattr(game, street, board)
+        game.next_round_bidding(len(players), players, street, board)
+        left = game.check_del(len(players), players)
+        game.equalize(players)
+        if left < 2:
+            game.winner = players[0]
+            game.settle(players)
+            return
+    game.define_winner(players)
+
+
+def outcome(game, players, deck):
+    # copies: restore writes back into the same lists
+    return (tuple(game.chips.stacks), tuple(game.payouts), game.winner, tuple(game.winners), dict(game.actions),
+            game.big_blind_stake, game.pot, tuple(players), tuple(deck.cards), tuple(game.river))
+
+
+def test_branches_from_one_snapshot_match():
+    branched = 0
+    for seed in range(40):
+        game, players, deck = start(seed)
+        state = []
+
+        def bid(street, board):
+            if street == 'flop':
+                state.append(take_snapshot(game, players, deck))
+            return game.bidding(players, street, board)
+
+        for _ in hand_steps(game, players, deck, bid):
+            pass
+        if not state:
+            continue  # over before the flop
+        played = outcome(game, players, deck)
+        for _ in range(2):
+            restore(state[0], game, players, deck)
+            assert game.winner is None and game.winners == [] and game.payouts is None
+            finish(game, players, deck)
+            assert outcome(game, players, deck) == played
+        branched += 1
+    assert branched
+
+
+def test_restore_takes_back_the_counts():
+    game, players, deck = start(3)
+    steps = hand_steps(game, players, deck, lambda street, board: game.bidding(players, street, board))
+    next(steps)
+    state = take_snapshot(game, players, deck)
+    for _ in steps:
+        pass
+    assert game.actions and game.payouts is not None
+    restore(state, game, players, deck)
+    assert game.actions == {} and game.payouts is None and game.winner is None
+    assert game.big_blind_stake == state.big_blind_stake and sum(game.chips.stacks) < 1500
+
+
+def test_round_trip():
+    game, players, deck = start(7)
+    steps = hand_steps(game, players, deck, lambda street, board: game.bidding(players, street, board))
+    next(steps)
+    state = take_snapshot(game, players, deck)
+    restore(state, game, players, deck)
+    again = take_snapshot(game, players, deck)
+    for name in state.__slots__:
+        assert getattr(again, name) == getattr(state, name), name
+    # a changed snapshot shares the deck with the one it came from
+    cards, drawn = state.draw(2)
+    assert drawn.deck is state.deck and drawn.deck_size == state.deck_size - 2 and len(cards) == 2
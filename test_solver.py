@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from solver import MAX_ACTIONS, Solver, build_tree
+
+RIVER = [0, 14, 28, 40, 11]
+
+
+def test_tree_of_one_street():
+    nodes = build_tree(1, 4)
+    first = nodes[0]
+    assert first.kind == 'decision' and first.actions == ['check', 'call', 'raise']
+    # check, check goes to the showdown with nothing paid; raise, fold leaves the first player
+    assert nodes[nodes[first.children[0]].children[0]].paid == (0, 0)
+    after_raise = nodes[first.children[2]]
+    assert after_raise.actions == ['fold', 'call', 'reraise']
+    assert nodes[after_raise.children[0]].kind == 'fold' and nodes[after_raise.children[0]].winner == 0
+    assert nodes[after_raise.children[2]].paid == (16, 16)
+    assert all(len(node.actions) <= MAX_ACTIONS for node in nodes)
+
+
+def test_exploitability_goes_down():
+    solver = Solver(RIVER, pot=40, stake=4, workers=1)
+    before = solver.exploitability()
+    solver.solve(200)
+    assert solver.exploitability() < before / 20
+    assert 0 < solver.value() < 40
+
+
+def test_policy_is_a_distribution():
+    solver = Solver(RIVER, pot=40, stake=4, workers=1).solve(50)
+    for history in ([], ['check'], ['raise']):
+        policy = solver.policy(history, [12, 25])
+        assert set(policy) == set(solver.nodes[solver.node_of(history)].actions)
+        assert np.isclose(sum(policy.values()), 1)
+    with pytest.raises(ValueError):
+        solver.node_of(['raise', 'fold'])
+
+
+def test_checkpoint_goes_on_where_it_stopped(tmp_path):
+    path = str(tmp_path / 'river.npz')
+    straight = Solver(RIVER, pot=40, stake=4, workers=1).solve(40)
+    Solver(RIVER, pot=40, stake=4, workers=1).solve(15, checkpoint=path)
+    resumed = Solver(RIVER, pot=40, stake=4, workers=1).solve(40, checkpoint=path, checkpoint_every=10)
+    assert resumed.iterations == 40
+    assert np.allclose(resumed.strategy_sums, straight.strategy_sums)
+    # a checkpoint of another subgame is not taken
+    with pytest.raises(ValueError):
+        Solver(RIVER, pot=60, stake=4, workers=1).solve(1, checkpoint=path)